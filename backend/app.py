@@ -1,31 +1,60 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify
+from flask.json.provider import DefaultJSONProvider
+import click
 from flask_cors import CORS
 from pymongo.mongo_client import MongoClient
 from pymongo.server_api import ServerApi
-from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, TEXT, CursorType, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+from pymongo import monitoring
+from pymongo.read_preferences import ReadPreference, SecondaryPreferred
+import bson
+from bson import Binary, ObjectId
 
 import bcrypt
 from cryptography.fernet import Fernet
 
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import os
+import atexit
 import time
 import json
 import base64
+import gzip
+import sys
+import hashlib
+import multiprocessing
+import pickle
+import tempfile
+import re
+import zlib
+import queue
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from dotenv import load_dotenv
 
 import nltk
-from nltk.sentiment.vader import SentimentIntensityAnalyzer
+from nltk.sentiment.vader import SentimentIntensityAnalyzer, VaderConstants
 
 
 try:
     from google import genai
+    from google.genai import types as genai_types
 except Exception as e:
     genai = None
     print("Warning: google.genai client not available:", e)
 import random
+try:
+    import orjson
+except ImportError as e:
+    orjson = None
+    print("Warning: orjson not available, using the standard json encoder:", e)
 
 
 # --------------------------------
@@ -38,11 +67,388 @@ app = Flask(__name__)
 
 CORS(app,
      resources={r"/*": {"origins": "*"}},
-     allow_headers=["Content-Type", "Authorization"],
+     allow_headers=["Content-Type", "Authorization", "Idempotency-Key", "Prefer"],
      methods=["GET", "POST", "PATCH", "PUT", "DELETE", "OPTIONS"])
 app.config['CORS_HEADERS'] = 'Content-Type'
 app.config['SECRET_KEY'] = os.getenv("SECRET_KEY")
 
+
+# --------------------------------
+# JSON ENCODING & RESPONSE COMPRESSION
+# --------------------------------
+ORJSON_OPTIONS = (orjson.OPT_NAIVE_UTC | orjson.OPT_NON_STR_KEYS) if orjson else 0
+GZIP_MIN_BYTES = int(os.getenv("GZIP_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+
+
+class MongoJSONProvider(DefaultJSONProvider):
+    """JSON provider that encodes ObjectId and datetime natively.
+
+    Handlers can jsonify Mongo documents (with a projection) as they come
+    back from the driver. orjson does the encoding when installed; otherwise
+    the stdlib encoder applies the same rules. Datetimes are stored as naive
+    UTC and are sent as ISO 8601 with a +00:00 offset.
+    """
+
+    @staticmethod
+    def default(o):
+        if isinstance(o, ObjectId):
+            return str(o)
+        if isinstance(o, datetime):
+            return (o if o.tzinfo else o.replace(tzinfo=timezone.utc)).isoformat()
+        return DefaultJSONProvider.default(o)
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=ORJSON_OPTIONS).decode()
+
+    def response(self, *args, **kwargs):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=self.default, option=ORJSON_OPTIONS)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+app.json = MongoJSONProvider(app)
+
+
+@app.after_request
+def compress_response(response):
+    """Gzip JSON bodies of at least GZIP_MIN_BYTES for clients that accept it."""
+    if response.mimetype != "application/json" or response.direct_passthrough:
+        return response
+    response.vary.add("Accept-Encoding")
+    if (
+        response.status_code != 200
+        or "Content-Encoding" in response.headers
+        or not request.accept_encodings["gzip"]
+    ):
+        return response
+
+    body = response.get_data()
+    if len(body) < GZIP_MIN_BYTES:
+        return response
+    response.set_data(gzip.compress(body, compresslevel=GZIP_LEVEL))
+    response.headers["Content-Encoding"] = "gzip"
+    # The compressed bytes differ, so the validator can only be weak
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+@app.cli.command("bench-json")
+@click.option("--rows", type=int, default=200, show_default=True, help="Documents per list.")
+@click.option("--repeat", type=int, default=200, show_default=True)
+def bench_json_command(rows, repeat):
+    """Compare hand conversion + stdlib json with the JSON provider on chat/session lists."""
+    now = datetime.utcnow()
+    messages = [{
+        "_id": ObjectId(), "sender_id": ObjectId(), "receiver_id": ObjectId(),
+        "sender_role": "patient", "message": "How are you feeling today? " * 3, "timestamp": now
+    } for _ in range(rows)]
+    sessions = [{
+        "_id": ObjectId(), "doctor_id": ObjectId(), "patient_id": ObjectId(),
+        "date": "2025-01-01", "time": "10:00", "status": "accepted", "created_by": "patient",
+        "edit_request": {"new_date": "2025-01-02", "new_time": "11:00", "requested_at": now}
+    } for _ in range(rows)]
+
+    def by_hand(docs):
+        return json.dumps([
+            {k: str(v) if isinstance(v, (ObjectId, datetime)) else v for k, v in d.items()}
+            for d in docs
+        ], default=str)
+
+    for name, docs in (("chat", messages), ("sessions", sessions)):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            by_hand(docs).encode()
+        legacy_ms = (time.perf_counter() - start) * 1000 / repeat
+        start = time.perf_counter()
+        for _ in range(repeat):
+            native = app.json.dumps(docs).encode()
+        native_ms = (time.perf_counter() - start) * 1000 / repeat
+        print(
+            f"{name}: {rows} docs, by hand {legacy_ms:.2f} ms, provider {native_ms:.2f} ms "
+            f"({legacy_ms / native_ms:.1f}x); {len(native)} bytes, "
+            f"{len(gzip.compress(native, compresslevel=GZIP_LEVEL))} gzipped"
+        )
+
+# --------------------------------
+# METRICS (Prometheus text format)
+# --------------------------------
+SLOW_REQUEST_SECONDS = float(os.getenv("SLOW_REQUEST_SECONDS", "1.0"))
+
+
+class Histogram:
+    """Thread-safe latency histogram in seconds with cumulative buckets."""
+
+    DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._counts = [0] * len(self.buckets)
+        self._count = 0
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        with self._lock:
+            self._count += 1
+            self._sum += seconds
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    self._counts[i] += 1
+                    break
+
+    def snapshot(self):
+        """{"count", "sum", "buckets": [[upper_bound, cumulative_count], ...]}"""
+        with self._lock:
+            cumulative, buckets = 0, []
+            for bound, n in zip(self.buckets, self._counts):
+                cumulative += n
+                buckets.append([bound, cumulative])
+            return {"count": self._count, "sum": self._sum, "buckets": buckets}
+
+
+class Metrics:
+    """Labelled counters and histograms, rendered for /metrics.
+
+    Values are recorded per process. Given a `directory` (METRICS_DIR, set
+    by gunicorn.conf.py), each process also writes its values to a file
+    there and render() sums every file, so a scrape that reaches any worker
+    covers all of them. Files of exited workers are kept, so counters never
+    go backwards while the master runs.
+    """
+
+    HELP = {
+        "http_requests_total": ("counter", "HTTP requests by endpoint, method and status."),
+        "http_request_duration_seconds": ("histogram", "Time to build a response, by endpoint."),
+        "http_request_mongo_commands_total": ("counter", "MongoDB commands issued while serving requests."),
+        "http_request_mongo_seconds_total": ("counter", "Time spent in MongoDB while serving requests."),
+        "mongo_commands_total": ("counter", "MongoDB commands by name and outcome."),
+        "mongo_command_duration_seconds": ("histogram", "MongoDB command round-trip time."),
+        "mongo_pool_checkout_wait_seconds": ("histogram", "Time spent waiting for a pooled connection."),
+        "mongo_pool_checkout_timeouts_total": ("counter", "Pool checkouts that timed out."),
+        "external_call_duration_seconds": ("histogram", "Gemini and Zoom call time by outcome."),
+    }
+
+    def __init__(self, directory=None):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._counters = {}    # (name, labels) -> value
+        self._histograms = {}  # (name, labels) -> Histogram
+        self._token = os.urandom(4).hex()  # pids are reused by later workers
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted((labels or {}).items()))
+
+    def inc(self, name, labels=None, value=1):
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def value(self, name, labels=None):
+        return self._counters.get(self._key(name, labels), 0)
+
+    def histogram(self, name, labels=None):
+        key = self._key(name, labels)
+        hist = self._histograms.get(key)
+        if hist is None:
+            with self._lock:
+                hist = self._histograms.setdefault(key, Histogram())
+        return hist
+
+    def observe(self, name, labels, seconds):
+        self.histogram(name, labels).observe(seconds)
+
+    def snapshot(self):
+        """This process's values as JSON-ready lists."""
+        with self._lock:
+            counters = list(self._counters.items())
+            histograms = list(self._histograms.items())
+        return {
+            "counters": [[name, labels, value] for (name, labels), value in counters],
+            "histograms": [[name, labels, hist.snapshot()] for (name, labels), hist in histograms],
+        }
+
+    def write(self):
+        """Replace this process's file in the shared directory."""
+        path = os.path.join(self.directory, f"metrics-{os.getpid()}-{self._token}.json")
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(self.snapshot(), f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def share(self, interval):
+        """Keep this process's file current: every `interval` seconds and at exit."""
+        def loop():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.write()
+                except OSError as e:
+                    print("Metrics write error:", e)
+
+        threading.Thread(target=loop, name="metrics-writer", daemon=True).start()
+        atexit.register(self.write)
+
+    def _snapshots(self):
+        if not self.directory:
+            return [self.snapshot()]
+        self.write()  # this process's own values are always current
+        snapshots = []
+        for name in os.listdir(self.directory):
+            if name.startswith("metrics-") and name.endswith(".json"):
+                try:
+                    with open(os.path.join(self.directory, name)) as f:
+                        snapshots.append(json.load(f))
+                except (OSError, ValueError):
+                    pass  # a worker that has just been cleaned up
+        return snapshots
+
+    def render(self):
+        counters, histograms = {}, {}
+        for snap in self._snapshots():
+            for name, labels, value in snap["counters"]:
+                key = (name, tuple(map(tuple, labels)))
+                counters[key] = counters.get(key, 0) + value
+            for name, labels, hist in snap["histograms"]:
+                key = (name, tuple(map(tuple, labels)))
+                total = histograms.setdefault(key, {
+                    "count": 0, "sum": 0.0, "buckets": [[bound, 0] for bound, _ in hist["buckets"]]
+                })
+                total["count"] += hist["count"]
+                total["sum"] += hist["sum"]
+                for pair, (_, cumulative) in zip(total["buckets"], hist["buckets"]):
+                    pair[1] += cumulative
+        lines, described = [], set()
+
+        def describe(name):
+            if name not in described and name in self.HELP:
+                kind, text = self.HELP[name]
+                lines.append(f"# HELP {name} {text}")
+                lines.append(f"# TYPE {name} {kind}")
+            described.add(name)
+
+        for (name, labels), value in sorted(counters.items()):
+            describe(name)
+            lines.append(f"{name}{_prom_labels(labels)} {value}")
+        for (name, labels), snap in sorted(histograms.items(), key=lambda kv: kv[0]):
+            describe(name)
+            for bound, cumulative in snap["buckets"]:
+                lines.append(f"{name}_bucket{_prom_labels(labels + (('le', str(bound)),))} {cumulative}")
+            lines.append(f"{name}_bucket{_prom_labels(labels + (('le', '+Inf'),))} {snap['count']}")
+            lines.append(f"{name}_sum{_prom_labels(labels)} {snap['sum']}")
+            lines.append(f"{name}_count{_prom_labels(labels)} {snap['count']}")
+        return "\n".join(lines) + "\n"
+
+
+def _prom_labels(labels):
+    if not labels:
+        return ""
+
+    def escape(value):
+        return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+    return "{" + ",".join(f'{k}="{escape(v)}"' for k, v in labels) + "}"
+
+
+METRICS_WRITE_SECONDS = float(os.getenv("METRICS_WRITE_SECONDS", "5"))
+metrics = Metrics(os.getenv("METRICS_DIR") or None)
+_request_stats = threading.local()  # per-request Mongo [commands, seconds]
+
+
+@contextmanager
+def timed_call(service, operation):
+    """Record the duration and outcome of one external call."""
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    except GeneratorExit:
+        outcome = "cancelled"  # a stream closed early by the client
+        raise
+    finally:
+        metrics.observe("external_call_duration_seconds", {
+            "service": service, "operation": operation, "outcome": outcome
+        }, time.perf_counter() - start)
+
+
+class CommandTimingListener(monitoring.CommandListener):
+    """Counts and times MongoDB commands, globally and for the current request.
+
+    Command events are published on the thread running the operation, so the
+    per-request totals only include commands issued while serving it.
+    """
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self._record(event, "ok")
+
+    def failed(self, event):
+        self._record(event, "error")
+
+    def _record(self, event, outcome):
+        seconds = event.duration_micros / 1e6
+        metrics.inc("mongo_commands_total", {"command": event.command_name, "outcome": outcome})
+        metrics.observe("mongo_command_duration_seconds", {"command": event.command_name}, seconds)
+        stats = getattr(_request_stats, "mongo", None)
+        if stats is not None:
+            stats[0] += 1
+            stats[1] += seconds
+
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    _request_stats.mongo = [0, 0.0]
+
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.pop("request_started", None)
+    if started is None:
+        return response
+    elapsed = time.perf_counter() - started
+    endpoint = request.endpoint or "unmatched"
+    mongo_commands, mongo_seconds = getattr(_request_stats, "mongo", None) or (0, 0.0)
+
+    metrics.inc("http_requests_total", {
+        "endpoint": endpoint, "method": request.method, "status": str(response.status_code)
+    })
+    metrics.observe("http_request_duration_seconds", {"endpoint": endpoint}, elapsed)
+    metrics.inc("http_request_mongo_commands_total", {"endpoint": endpoint}, mongo_commands)
+    metrics.inc("http_request_mongo_seconds_total", {"endpoint": endpoint}, mongo_seconds)
+
+    if elapsed >= SLOW_REQUEST_SECONDS:
+        print(
+            f"🐢 Slow request: {request.method} {request.full_path} -> {response.status_code} "
+            f"in {elapsed:.3f}s ({mongo_commands} Mongo commands, {mongo_seconds:.3f}s in Mongo)"
+        )
+    return response
+
+
+@app.teardown_request
+def clear_request_stats(exc):
+    _request_stats.mongo = None
+
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+
 # --------------------------------
 # CHATBOT CONFIGURATION (optional)
 # --------------------------------
@@ -51,22 +457,378 @@ app.config['SECRET_KEY'] = os.getenv("SECRET_KEY")
 #         genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
 #     except Exception as e:
 #         print("Warning: could not configure genai:", e)
-client = genai.Client()  # reads GEMINI_API_KEY internally
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "60"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", "2"))
+
+_llm_client = None
+_llm_client_lock = threading.Lock()
+_llm_slots = threading.BoundedSemaphore(LLM_MAX_CONCURRENCY)
+
+
+class LLMBusy(Exception):
+    """Raised when every LLM slot is taken for longer than LLM_QUEUE_TIMEOUT."""
+
+
+def get_llm_client():
+    """Return the shared Gemini client (reads GEMINI_API_KEY internally)."""
+    global _llm_client
+    if _llm_client is None:
+        with _llm_client_lock:
+            if _llm_client is None:
+                _llm_client = genai.Client(http_options=genai_types.HttpOptions(
+                    timeout=int(LLM_TIMEOUT_SECONDS * 1000)  # milliseconds
+                ))
+    return _llm_client
+
+
+def acquire_llm_slot():
+    if not _llm_slots.acquire(timeout=LLM_QUEUE_TIMEOUT):
+        raise LLMBusy()
+
+
+def release_llm_slot():
+    _llm_slots.release()
+
+
+def generate_text(prompt):
+    """Run one completion under the global LLM concurrency cap."""
+    acquire_llm_slot()
+    try:
+        with timed_call("gemini", "generate"):
+            response = get_llm_client().models.generate_content(
+                model=GEMINI_MODEL,
+                contents=prompt
+            )
+    finally:
+        release_llm_slot()
+    return response.text.strip()
+
+
+def stream_text(prompt):
+    """Yield completion text chunks as they arrive.
+
+    The caller must hold an LLM slot for as long as the stream is open.
+    """
+    with timed_call("gemini", "stream"):
+        for chunk in get_llm_client().models.generate_content_stream(
+            model=GEMINI_MODEL,
+            contents=prompt
+        ):
+            if chunk.text:
+                yield chunk.text
+
+
+@app.errorhandler(LLMBusy)
+def handle_llm_busy(e):
+    return jsonify({"error": "AI assistant is busy, please try again shortly."}), 503, {"Retry-After": "2"}
 
 
 # --------------------------------
 # MongoDB Connection
 # --------------------------------
-database = MongoClient(os.getenv("MONGO_URI"))
-db = database['MINDLINKAI']
+class PoolWaitListener(monitoring.ConnectionPoolListener):
+    """Times how long each operation waits to check a connection out of the pool.
+
+    Check-out start and completion are reported on the calling thread, so a
+    thread-local start time is enough to pair them.
+    """
+
+    def __init__(self):
+        self.wait = metrics.histogram("mongo_pool_checkout_wait_seconds")
+        self._local = threading.local()
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+
+    def connection_checked_out(self, event):
+        started = getattr(self._local, "started", None)
+        if started is not None:
+            self.wait.observe(time.perf_counter() - started)
+            self._local.started = None
+
+    def connection_check_out_failed(self, event):
+        self._local.started = None
+        if event.reason == monitoring.ConnectionCheckOutFailedReason.TIMEOUT:
+            metrics.inc("mongo_pool_checkout_timeouts_total")
+
+    def pool_created(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        pass
+
+    def connection_checked_in(self, event):
+        pass
+
+
+MONGO_POOL_OPTIONS = {
+    "maxPoolSize": int(os.getenv("MONGO_MAX_POOL_SIZE", "100")),
+    "minPoolSize": int(os.getenv("MONGO_MIN_POOL_SIZE", "0")),
+    "maxIdleTimeMS": int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "300000")),
+    "waitQueueTimeoutMS": int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "5000")),
+    "serverSelectionTimeoutMS": int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "10000")),
+    "connectTimeoutMS": int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "10000")),
+    "socketTimeoutMS": int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "30000")),
+}
+mongo_pool_listener = PoolWaitListener()
+
+# connect=False: no sockets or monitor threads until the first operation, so
+# the client is only ever used in the process (worker) that created it
+database = MongoClient(
+    os.getenv("MONGO_URI"),
+    connect=False,
+    event_listeners=[mongo_pool_listener, CommandTimingListener()],
+    **MONGO_POOL_OPTIONS
+)
+db = database[os.getenv("MONGO_DB_NAME", "MINDLINKAI")]
 patients_col = db['Patient']
 doctors_col = db['Doctor']
 journals_col = db['Journals']
 doctor_patients_col = db['DoctorPatients']  
 reports_col = db['Reports']
 sessions_col = db["Sessions"]
-
-
+messages_col = db["Messages"]
+requests_col = db["Requests"]
+migrations_col = db["Migrations"]
+summaries_col = db["ReportSummaries"]
+jobs_col = db["Jobs"]
+conversations_col = db["ChatbotConversations"]
+mood_rollups_col = db["MoodRollups"]
+journals_archive_col = db["JournalsArchive"]
+events_col = db["Events"]
+cache_generations_col = db["CacheGenerations"]
+
+
+# Read-only analytics may be served by a secondary no more than
+# ANALYTICS_MAX_STALENESS_SECONDS (>= 90) behind the primary. The default,
+# "primary", keeps every read on the primary.
+ANALYTICS_READ_PREFERENCE = os.getenv("ANALYTICS_READ_PREFERENCE", "primary")
+ANALYTICS_MAX_STALENESS_SECONDS = int(os.getenv("ANALYTICS_MAX_STALENESS_SECONDS", "120"))
+if ANALYTICS_READ_PREFERENCE == "secondaryPreferred":
+    analytics_read_preference = SecondaryPreferred(max_staleness=ANALYTICS_MAX_STALENESS_SECONDS)
+else:
+    analytics_read_preference = ReadPreference.PRIMARY
+
+
+def analytics_read(col):
+    """The same collection, read with the analytics read preference."""
+    return col.with_options(read_preference=analytics_read_preference)
+
+
+# --------------------------------
+# Index Migrations
+# --------------------------------
+# Each migration is (version, description, steps). A step is either
+# (collection, keys, options) to create an index, (collection, name) to
+# drop one, or a callable for a (re-runnable) data change. Applied versions
+# are recorded in the Migrations collection, so schema changes are made by
+# appending a new version, never by editing one.
+MIGRATIONS = [
+    (1, "indexes for login, chat, sessions, journals, requests and reports", [
+        (patients_col, [("email", ASCENDING)], {"unique": True, "name": "email_unique"}),
+        (doctors_col, [("email", ASCENDING)], {"unique": True, "name": "email_unique"}),
+        (journals_col, [("patient_id", ASCENDING), ("date", DESCENDING)], {"name": "patient_date"}),
+        (messages_col, [("sender_id", ASCENDING), ("receiver_id", ASCENDING), ("timestamp", ASCENDING)],
+         {"name": "sender_receiver_timestamp"}),
+        (sessions_col, [("doctor_id", ASCENDING), ("date", ASCENDING), ("time", ASCENDING)],
+         {"name": "doctor_date_time"}),
+        (sessions_col, [("patient_id", ASCENDING), ("date", ASCENDING), ("time", ASCENDING)],
+         {"name": "patient_date_time"}),
+        (requests_col, [("doctor_id", ASCENDING), ("status", ASCENDING)], {"name": "doctor_status"}),
+        (requests_col, [("patient_id", ASCENDING), ("doctor_id", ASCENDING)], {"name": "patient_doctor"}),
+        (doctor_patients_col, [("doctor_id", ASCENDING)], {"name": "doctor_id"}),
+        (reports_col, [("patient_id", ASCENDING)], {"name": "patient_id"}),
+    ]),
+    (2, "keyset pagination index for chat history", [
+        (messages_col, [("sender_id", ASCENDING), ("receiver_id", ASCENDING),
+                        ("timestamp", ASCENDING), ("_id", ASCENDING)],
+         {"name": "sender_receiver_timestamp_id"}),
+        (messages_col, "sender_receiver_timestamp"),
+    ]),
+    (3, "report summary cache lookup by patient", [
+        (summaries_col, [("patient_id", ASCENDING)], {"name": "patient_id"}),
+    ]),
+    (4, "background job idempotency keys", [
+        (jobs_col, [("idempotency_key", ASCENDING)], {"unique": True, "name": "idempotency_key_unique"}),
+        (jobs_col, [("status", ASCENDING)], {"name": "status"}),
+    ]),
+    (5, "mood rollup range reads", [
+        (mood_rollups_col, [("patient_id", ASCENDING), ("granularity", ASCENDING), ("bucket", ASCENDING)],
+         {"unique": True, "name": "patient_granularity_bucket"}),
+    ]),
+    (6, "journal retention: TTL on expire_at, compaction scan on archive_after", [
+        (journals_col, [("expire_at", ASCENDING)], {"expireAfterSeconds": 0, "name": "expire_at_ttl"}),
+        (journals_col, [("archive_after", ASCENDING)], {"sparse": True, "name": "archive_after"}),
+    ]),
+    (7, "unique keys behind single-round-trip upserts", [
+        # Read-then-write races may have left duplicates the unique builds would reject
+        lambda: dedupe_documents(journals_col, ["patient_id", "date"],
+                                 [("updated_at", DESCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),
+        lambda: dedupe_documents(reports_col, ["patient_id"], [("updated_at", DESCENDING), ("_id", DESCENDING)]),
+        # "approved" < "pending" < "rejected": keep the most advanced request
+        lambda: dedupe_documents(requests_col, ["patient_id", "doctor_id"], [("status", ASCENDING), ("_id", DESCENDING)]),
+        lambda: dedupe_documents(doctor_patients_col, ["doctor_id"], [("_id", ASCENDING)], merge_array="patients"),
+        (journals_col, "patient_date"),
+        (journals_col, [("patient_id", ASCENDING), ("date", DESCENDING)], {"unique": True, "name": "patient_date_unique"}),
+        (reports_col, "patient_id"),
+        (reports_col, [("patient_id", ASCENDING)], {"unique": True, "name": "patient_id_unique"}),
+        (requests_col, "patient_doctor"),
+        (requests_col, [("patient_id", ASCENDING), ("doctor_id", ASCENDING)], {"unique": True, "name": "patient_doctor_unique"}),
+        (doctor_patients_col, "doctor_id"),
+        (doctor_patients_col, [("doctor_id", ASCENDING)], {"unique": True, "name": "doctor_id_unique"}),
+    ]),
+    (8, "doctor directory filter and search", [
+        (doctors_col, [("specialization", ASCENDING), ("_id", ASCENDING)], {"name": "specialization_id"}),
+        (doctors_col, [("name", TEXT), ("specialization", TEXT)], {"name": "directory_text"}),
+    ]),
+    (9, "expire finished jobs", [
+        (jobs_col, [("expire_at", ASCENDING)], {"expireAfterSeconds": 0, "name": "expire_at_ttl"}),
+    ]),
+    (10, "build mood rollups from existing journals", [
+        lambda: backfill_mood_rollups(),
+    ]),
+    (11, "capped event log shared by the workers' SSE streams", [
+        lambda: create_event_log(),
+    ]),
+]
+
+
+def dedupe_documents(col, keys, keep_order, merge_array=None):
+    """Keep one document per value of `keys`, the first in `keep_order`.
+
+    `merge_array` names an array field whose values from the removed
+    duplicates are added to the kept document. Returns how many were removed.
+    """
+    group = {"_id": {k: f"${k}" for k in keys}, "ids": {"$push": "$_id"}, "count": {"$sum": 1}}
+    if merge_array:
+        group["merged"] = {"$push": f"${merge_array}"}
+    removed = 0
+    duplicates = col.aggregate([
+        {"$sort": dict(keep_order)},
+        {"$group": group},
+        {"$match": {"count": {"$gt": 1}}}
+    ], allowDiskUse=True)
+    for dup in duplicates:
+        keep, *extra = dup["ids"]
+        if merge_array:
+            values = [v for arr in dup["merged"] if isinstance(arr, list) for v in arr]
+            col.update_one({"_id": keep}, {"$addToSet": {merge_array: {"$each": values}}})
+        removed += col.delete_many({"_id": {"$in": extra}}).deleted_count
+    if removed:
+        print(f"🧹 Removed {removed} duplicate {col.name} documents")
+    return removed
+
+
+def run_migrations():
+    """Create the indexes of every migration version not yet applied."""
+    applied = {m["_id"] for m in migrations_col.find({}, {"_id": 1})}
+    for version, description, steps in MIGRATIONS:
+        if version in applied:
+            continue
+        try:
+            for step in steps:
+                if callable(step):
+                    step()
+                elif len(step) == 2:
+                    col, name = step
+                    if name in col.index_information():
+                        col.drop_index(name)
+                else:
+                    col, keys, options = step
+                    col.create_index(keys, **options)
+        except OperationFailure as e:
+            raise RuntimeError(f"Migration {version} ({description}) failed: {e}") from e
+        migrations_col.insert_one({
+            "_id": version,
+            "description": description,
+            "applied_at": datetime.utcnow()
+        })
+        print(f"✅ Applied migration {version}: {description}")
+
+
+# Query shapes of the hot routes: (route, collection, filter, sort).
+# Used by `flask --app app check-indexes` to catch collection scans.
+_sample_id = ObjectId()
+QUERY_SHAPES = [
+    ("login_patient", patients_col, {"email": "x@example.com"}, None),
+    ("login_doctor", doctors_col, {"email": "x@example.com"}, None),
+    ("get_journals", journals_col, {"patient_id": str(_sample_id)}, None),
+    ("get_today_mood", journals_col, {"patient_id": str(_sample_id), "date": "2000-01-01"}, None),
+    ("get_patient_mood_data", mood_rollups_col, {"patient_id": str(_sample_id), "granularity": "day",
+                                                 "bucket": {"$gte": "2000-01-01"}}, [("bucket", DESCENDING)]),
+    ("get_chat", messages_col, {"$or": [
+        {"sender_id": _sample_id, "receiver_id": _sample_id},
+        {"sender_id": _sample_id, "receiver_id": _sample_id}
+    ]}, [("timestamp", DESCENDING), ("_id", DESCENDING)]),
+    ("create_session (doctor slot)", sessions_col, {"doctor_id": _sample_id, "date": "2000-01-01", "time": "10:00"}, None),
+    ("create_session (patient slot)", sessions_col, {"patient_id": _sample_id, "date": "2000-01-01", "time": "10:00"}, None),
+    ("get_sessions (doctor)", sessions_col, {"doctor_id": _sample_id}, [("date", ASCENDING)]),
+    ("get_sessions (patient)", sessions_col, {"patient_id": _sample_id}, [("date", ASCENDING)]),
+    ("get_doctor_requests", requests_col, {"doctor_id": _sample_id, "status": "pending"}, None),
+    ("send_request_to_doctor", requests_col, {"patient_id": _sample_id, "doctor_id": _sample_id}, None),
+    ("get_patients_for_doctor", doctor_patients_col, {"doctor_id": _sample_id}, None),
+    ("get_report", reports_col, {"patient_id": str(_sample_id)}, None),
+    ("get_all_doctors (specialization)", doctors_col, {"specialization": "Psychiatrist"}, [("_id", ASCENDING)]),
+    ("get_mood_trend", mood_rollups_col, {"patient_id": str(_sample_id), "granularity": "day",
+                                          "bucket": {"$gte": "2000-01-01", "$lte": "2000-12-31"}},
+     [("bucket", ASCENDING)]),
+]
+
+
+def _plan_stages(plan):
+    """Yield every stage name of an explain() plan tree."""
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            yield plan["stage"]
+        for value in plan.values():
+            yield from _plan_stages(value)
+    elif isinstance(plan, list):
+        for item in plan:
+            yield from _plan_stages(item)
+
+
+def find_collection_scans():
+    """Run explain() on every hot query shape and return the ones that COLLSCAN."""
+    scans = []
+    for route, col, query, sort in QUERY_SHAPES:
+        cursor = col.find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        winning_plan = cursor.explain()["queryPlanner"]["winningPlan"]
+        if "COLLSCAN" in _plan_stages(winning_plan):
+            scans.append(route)
+    return scans
+
+
+@app.cli.command("migrate")
+def migrate_command():
+    """Apply pending index migrations."""
+    run_migrations()
+
+
+@app.cli.command("check-indexes")
+def check_indexes_command():
+    """Fail if any hot route query shape does a collection scan."""
+    scans = find_collection_scans()
+    for route in scans:
+        print("❌ COLLSCAN:", route)
+    if scans:
+        sys.exit(1)
+    print("✅ All hot queries use an index.")
 
 
 # --------------------------------
@@ -97,14 +859,70 @@ custom_words = {
     "okay": 0.5, "fine": 0.5, "tired": -1.0, "bored": -1.5
 }
 
-nltk.download('vader_lexicon')
-sentiment_analyzer = SentimentIntensityAnalyzer()
-sentiment_analyzer.lexicon.update(custom_words)
+# Stored on each scored journal so entries scored with an older
+# `custom_words` can be found and re-scored.
+LEXICON_VERSION = hashlib.sha1(json.dumps(custom_words, sort_keys=True).encode()).hexdigest()[:12]
 
-def analyze_mood(text):
-    """Analyze mood using VADER sentiment scores."""
-    scores = sentiment_analyzer.polarity_scores(text)
-    compound = scores['compound']
+# The VADER lexicon merged with `custom_words` is precompiled to a pickle,
+# so workers start without network access to the NLTK downloader.
+LEXICON_PATH = os.getenv(
+    "SENTIMENT_LEXICON_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "vader_lexicon.pkl")
+)
+
+_sentiment_analyzer = None
+_sentiment_lock = threading.Lock()
+
+
+def build_lexicon(path=LEXICON_PATH):
+    """Merge the VADER lexicon with `custom_words` and save it to `path`."""
+    try:
+        nltk.data.find('sentiment/vader_lexicon.zip')
+    except LookupError:
+        nltk.download('vader_lexicon')
+    lexicon = SentimentIntensityAnalyzer().lexicon
+    lexicon.update(custom_words)
+    # Write beside the target and rename over it, so concurrent readers see
+    # either the old file or the complete new one
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump({"version": LEXICON_VERSION, "lexicon": lexicon}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return lexicon
+
+
+def load_lexicon(path=LEXICON_PATH):
+    """Load the precompiled lexicon, rebuilding it if missing or outdated."""
+    try:
+        with open(path, "rb") as f:
+            compiled = pickle.load(f)
+        if compiled.get("version") == LEXICON_VERSION:
+            return compiled["lexicon"]
+    except (OSError, pickle.UnpicklingError, EOFError):
+        pass
+    return build_lexicon(path)
+
+
+def get_sentiment_analyzer():
+    """Build the VADER analyzer on first use from the precompiled lexicon."""
+    global _sentiment_analyzer
+    if _sentiment_analyzer is None:
+        with _sentiment_lock:
+            if _sentiment_analyzer is None:
+                # Skip __init__, which re-reads and parses the raw lexicon file
+                analyzer = SentimentIntensityAnalyzer.__new__(SentimentIntensityAnalyzer)
+                analyzer.lexicon = load_lexicon()
+                analyzer.constants = VaderConstants()
+                _sentiment_analyzer = analyzer
+    return _sentiment_analyzer
+
+
+def classify_mood(compound):
+    """Map a VADER compound score to one of the mood labels."""
     if compound >= 0.5:
         mood = "Happy"
 
@@ -132,7 +950,30 @@ def analyze_mood(text):
     # else:
     #     mood = "Angry"
 
-    return {"compound": compound, "mood": mood}
+    return mood
+
+
+def analyze_mood(text):
+    """Analyze mood using VADER sentiment scores."""
+    compound = get_sentiment_analyzer().polarity_scores(text)['compound']
+    return {"compound": compound, "mood": classify_mood(compound)}
+
+
+def analyze_moods(texts):
+    """Convenience wrapper: analyze_mood over a list, scoring duplicates once.
+
+    VADER's per-text work (tokenizing, context-dependent valence rules) is
+    not shared between texts, so this is no faster per distinct text than
+    calling analyze_mood in a loop. Bulk throughput comes from
+    rescore_journals spreading batches across processes.
+    """
+    scored = {}
+    results = []
+    for text in texts:
+        if text not in scored:
+            scored[text] = analyze_mood(text)
+        results.append(scored[text])
+    return results
 
 # --------------------------------
 # Helper functions
@@ -143,11 +984,722 @@ def encrypt_text(text):
 def decrypt_text(cipher_text):
     return fernet.decrypt(cipher_text.encode()).decode()
 
+def native_thread_pool(max_workers, thread_name_prefix):
+    """A ThreadPoolExecutor whose jobs run on real OS threads.
+
+    Under gunicorn's gevent workers `threading` is monkey-patched, so a
+    plain executor would run CPU-bound C calls (bcrypt, Fernet) as greenlets
+    and stall every other request in the worker; gevent's executor keeps
+    them on native threads, where they release the GIL.
+    """
+    try:
+        from gevent import monkey
+        if monkey.is_module_patched("threading"):
+            from gevent.threadpool import ThreadPoolExecutor as GeventThreadPoolExecutor
+            return GeventThreadPoolExecutor(max_workers=max_workers)
+    except ImportError:
+        pass
+    return ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=thread_name_prefix)
+
+
+# bcrypt runs on a small bounded pool so a login storm cannot occupy every
+# request thread; when the pool and its queue are full, requests are shed.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_WORKERS = int(os.getenv("PASSWORD_WORKERS", "2"))
+PASSWORD_QUEUE_LIMIT = int(os.getenv("PASSWORD_QUEUE_LIMIT", "16"))
+PASSWORD_WAIT_TIMEOUT = float(os.getenv("PASSWORD_WAIT_TIMEOUT", "5"))
+
+_password_pool = native_thread_pool(PASSWORD_WORKERS, "bcrypt")
+_password_slots = threading.BoundedSemaphore(PASSWORD_WORKERS + PASSWORD_QUEUE_LIMIT)
+
+
+class PasswordPoolBusy(Exception):
+    """Raised when password hashing is saturated and the request is shed."""
+
+
+def _run_password_job(fn, *args):
+    if not _password_slots.acquire(blocking=False):
+        raise PasswordPoolBusy()
+    try:
+        future = _password_pool.submit(fn, *args)
+    except Exception:
+        _password_slots.release()
+        raise
+    future.add_done_callback(lambda _: _password_slots.release())
+    try:
+        return future.result(timeout=PASSWORD_WAIT_TIMEOUT)
+    except FutureTimeoutError:
+        raise PasswordPoolBusy()
+
+
 def hash_password(password):
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
+    return _run_password_job(
+        lambda pw: bcrypt.hashpw(pw, bcrypt.gensalt(rounds=BCRYPT_ROUNDS)),
+        password.encode('utf-8')
+    )
 
 def check_password(password, hashed):
-    return bcrypt.checkpw(password.encode('utf-8'), hashed)
+    return _run_password_job(bcrypt.checkpw, password.encode('utf-8'), hashed)
+
+
+@app.errorhandler(PasswordPoolBusy)
+def handle_password_pool_busy(e):
+    return jsonify({"error": "Server is busy, please try again shortly."}), 503, {"Retry-After": "1"}
+
+
+def _percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)] if ordered else 0.0
+
+
+@app.cli.command("bench-login")
+@click.option("--logins", type=int, default=200, show_default=True, help="Total login attempts.")
+@click.option("--concurrency", type=int, default=32, show_default=True, help="Simultaneous login clients.")
+def bench_login_command(logins, concurrency):
+    """Run a login storm and measure /mood/today latency while it lasts.
+
+    Uses a temporary patient in the configured database and removes it after.
+    """
+    email = f"bench-login-{ObjectId()}@example.com"
+    patient_id = patients_col.insert_one({
+        "name": "Bench", "email": email, "password": hash_password("bench-password")
+    }).inserted_id
+    body = {"email": email, "password": "bench-password"}
+
+    def mood_latencies(stop):
+        client, samples = app.test_client(), []
+        while not stop.is_set():
+            start = time.perf_counter()
+            client.get(f"/mood/today/{patient_id}")
+            samples.append(time.perf_counter() - start)
+        return samples
+
+    def login(_):
+        return app.test_client().post("/login/patient", json=body).status_code
+
+    try:
+        baseline_stop = threading.Event()
+        threading.Timer(1.0, baseline_stop.set).start()
+        baseline = mood_latencies(baseline_stop)
+
+        storm_stop = threading.Event()
+        with ThreadPoolExecutor(max_workers=concurrency + 1) as pool:
+            during = pool.submit(mood_latencies, storm_stop)
+            start = time.perf_counter()
+            statuses = list(pool.map(login, range(logins)))
+            elapsed = time.perf_counter() - start
+            storm_stop.set()
+            during = during.result()
+    finally:
+        patients_col.delete_one({"_id": patient_id})
+
+    outcomes = {code: statuses.count(code) for code in sorted(set(statuses))}
+    print(f"logins: {logins} in {elapsed:.2f}s ({statuses.count(200) / elapsed:.1f} successful/sec), statuses {outcomes}")
+    for name, samples in (("baseline", baseline), ("during storm", during)):
+        print(
+            f"/mood/today {name}: p50 {_percentile(samples, 0.5) * 1000:.1f} ms, "
+            f"p95 {_percentile(samples, 0.95) * 1000:.1f} ms, max {max(samples, default=0) * 1000:.1f} ms "
+            f"({len(samples)} requests)"
+        )
+
+
+class LRUCache:
+    """A small thread-safe, memory-only LRU map with optional TTL and hit stats."""
+
+    def __init__(self, maxsize, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or (item[0] is not None and item[0] < time.time()):
+                if item is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def set(self, key, value):
+        expires_at = time.time() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+
+class SingleFlight:
+    """Collapse concurrent calls for the same key into one execution."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}  # key -> Future
+
+    def do(self, key, fn):
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+        if not leader:
+            return future.result()
+
+        try:
+            future.set_result(fn())
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+        return future.result()
+
+
+# Fire-and-forget work that must not hold up the response (e.g. precomputing)
+background_pool = ThreadPoolExecutor(
+    max_workers=int(os.getenv("BACKGROUND_WORKERS", "2")),
+    thread_name_prefix="background"
+)
+
+
+# --------------------------------
+# Decrypted Journal Cache
+# --------------------------------
+# Plaintext journals are only ever held in this process's memory, keyed by
+# entry _id and checked against the entry's updated_at/created_at version.
+JOURNAL_CACHE_SIZE = int(os.getenv("JOURNAL_CACHE_SIZE", "2048"))
+DECRYPT_BATCH_THRESHOLD = 32  # below this, a thread pool costs more than it saves
+
+journal_cache = LRUCache(JOURNAL_CACHE_SIZE)
+_decrypt_pool = native_thread_pool(int(os.getenv("DECRYPT_WORKERS", "4")), "decrypt")
+
+
+def _safe_decrypt(cipher_text):
+    try:
+        return decrypt_text(cipher_text)
+    except Exception:
+        return None
+
+
+def decrypt_journals(entries):
+    """Return the decrypted text of each journal entry, using the cache."""
+    texts = [None] * len(entries)
+    misses = []
+    for i, e in enumerate(entries):
+        version = e.get("updated_at") or e.get("created_at")
+        cached = journal_cache.get(str(e["_id"]))
+        if cached and cached[0] == version:
+            texts[i] = cached[1]
+        else:
+            misses.append(i)
+
+    ciphers = [entries[i]["entry"] for i in misses]
+    if len(misses) >= DECRYPT_BATCH_THRESHOLD:
+        decrypted = list(_decrypt_pool.map(_safe_decrypt, ciphers))
+    else:
+        decrypted = [_safe_decrypt(c) for c in ciphers]
+
+    for i, text in zip(misses, decrypted):
+        if text is None:
+            texts[i] = "(Error decrypting entry)"
+            continue
+        texts[i] = text
+        e = entries[i]
+        journal_cache.set(str(e["_id"]), (e.get("updated_at") or e.get("created_at"), text))
+    return texts
+
+# --------------------------------
+# CONDITIONAL GET (ETag / Last-Modified)
+# --------------------------------
+def collection_version(col, query):
+    """Cheap validator for a list endpoint: (count, newest updated_at/created_at).
+
+    Any insert or update moves the newest timestamp and any delete changes
+    the count, so the pair changes whenever the listed documents do.
+    """
+    rows = list(col.aggregate([
+        {"$match": query},
+        {"$group": {
+            "_id": None,
+            "count": {"$sum": 1},
+            "last": {"$max": {"$ifNull": ["$updated_at", "$created_at"]}}
+        }}
+    ]))
+    if not rows:
+        return 0, None
+    return rows[0]["count"], rows[0]["last"]
+
+
+def conditional_json(version, build, max_age=0, last_modified=None):
+    """Serve build() as JSON, or a bodyless 304 if the client's copy is current.
+
+    `version` is whatever cheaply identifies the current state (timestamps,
+    counts, hashes); it is hashed together with the request URL into the
+    ETag, so build() only runs when the client has nothing usable. Responses
+    are private (they hold patient data) and revalidate after `max_age`.
+    """
+    etag = hashlib.sha1(
+        json.dumps([request.full_path, version], default=str).encode()
+    ).hexdigest()
+    if isinstance(last_modified, datetime):
+        last_modified = last_modified.replace(microsecond=0)
+    else:
+        last_modified = None
+
+    if request.if_none_match:
+        fresh = request.if_none_match.contains_weak(etag)
+    else:
+        since = request.if_modified_since
+        fresh = (
+            last_modified is not None and since is not None
+            and last_modified.replace(tzinfo=timezone.utc) <= since.replace(tzinfo=timezone.utc)
+        )
+
+    response = Response(status=304) if fresh else jsonify(build())
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    if max_age:
+        response.headers["Cache-Control"] = f"private, max-age={max_age}, must-revalidate"
+    else:
+        response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+
+def parse_stamp(value):
+    """updated_at is a datetime on most documents but a string on reports."""
+    if isinstance(value, datetime) or value is None:
+        return value
+    try:
+        return datetime.strptime(value, "%Y-%m-%d %H:%M:%S")
+    except (TypeError, ValueError):
+        return None
+
+# --------------------------------
+# EVENT PUSH (Server-Sent Events)
+# --------------------------------
+SSE_KEEPALIVE_SECONDS = int(os.getenv("SSE_KEEPALIVE_SECONDS", "15"))
+
+
+EVENT_BROKER = os.getenv("EVENT_BROKER", "mongo")  # "mongo" (any number of workers) or "memory"
+EVENT_LOG_BYTES = int(os.getenv("EVENT_LOG_BYTES", str(16 * 1024 * 1024)))
+EVENT_DEDUPE_SIZE = 1000
+
+
+class InMemoryBroker:
+    """Fan events out to subscriber queues held in this process.
+
+    Only subscribers in the publishing process see an event, so this broker
+    suits the single-process dev server and tests; MongoEventBroker shares
+    events between gunicorn workers.
+    """
+
+    def __init__(self, max_queue=100):
+        self.max_queue = max_queue
+        self._lock = threading.Lock()
+        self._subscribers = {}  # user_id -> set of queues
+
+    def subscribe(self, user_id):
+        q = queue.Queue(maxsize=self.max_queue)
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(q)
+        return q
+
+    def unsubscribe(self, user_id, q):
+        with self._lock:
+            queues = self._subscribers.get(user_id)
+            if queues:
+                queues.discard(q)
+                if not queues:
+                    del self._subscribers[user_id]
+
+    def publish(self, user_ids, event, data):
+        self._deliver(user_ids, f"event: {event}\ndata: {app.json.dumps(data)}\n\n")
+
+    def _deliver(self, user_ids, message):
+        with self._lock:
+            targets = [q for uid in user_ids for q in self._subscribers.get(uid, ())]
+        for q in targets:
+            try:
+                q.put_nowait(message)
+            except queue.Full:
+                pass  # slow client; it resyncs over REST on reconnect
+
+
+class MongoEventBroker(InMemoryBroker):
+    """Share events between worker processes through a capped collection.
+
+    publish() appends the formatted event to the Events collection (created
+    capped by migration 11). Each process follows it with one tailable
+    cursor, started with its first subscriber, and hands events for its own
+    subscribers to their queues.
+    """
+
+    def __init__(self, col, max_queue=100):
+        super().__init__(max_queue)
+        self.col = col
+        self._tail = None
+
+    def subscribe(self, user_id):
+        q = super().subscribe(user_id)
+        with self._lock:
+            if self._tail is None:
+                self._tail = threading.Thread(target=self._follow, name="event-tail", daemon=True)
+                self._tail.start()
+        return q
+
+    def publish(self, user_ids, event, data):
+        self.col.insert_one({
+            "user_ids": list(user_ids),
+            "message": f"event: {event}\ndata: {app.json.dumps(data)}\n\n",
+            "created_at": datetime.utcnow()
+        })
+
+    def _follow(self):
+        # ObjectIds from different processes are only ordered to the second,
+        # so a reopened cursor starts a little before the last event handled
+        # and skips the ids it has already seen
+        handled = OrderedDict()
+        since = datetime.utcnow()
+        while True:
+            try:
+                cursor = self.col.find({"_id": {"$gte": ObjectId.from_datetime(since)}},
+                                       cursor_type=CursorType.TAILABLE_AWAIT)
+                while cursor.alive:
+                    for doc in cursor:
+                        if doc["_id"] in handled:
+                            continue
+                        handled[doc["_id"]] = True
+                        if len(handled) > EVENT_DEDUPE_SIZE:
+                            handled.popitem(last=False)
+                        since = doc["_id"].generation_time - timedelta(seconds=2)
+                        self._deliver(doc["user_ids"], doc["message"])
+            except Exception as e:
+                print("Event tail error:", e)
+            time.sleep(1)  # the cursor died (e.g. the log was empty); reopen it
+
+
+def create_event_log():
+    """Create the capped Events collection that MongoEventBroker tails."""
+    if events_col.name not in db.list_collection_names():
+        db.create_collection(events_col.name, capped=True, size=EVENT_LOG_BYTES)
+    elif not events_col.options().get("capped"):
+        db.command("convertToCapped", events_col.name, size=EVENT_LOG_BYTES)
+
+
+event_broker = MongoEventBroker(events_col) if EVENT_BROKER == "mongo" else InMemoryBroker()
+
+
+def publish_event(user_ids, event, data):
+    """Push an event to the given users. Best effort: never fails the write."""
+    try:
+        event_broker.publish({str(uid) for uid in user_ids if uid}, event, data)
+    except Exception as e:
+        print("Event publish error:", e)
+
+
+@app.route('/events/<user_id>', methods=['GET'])
+def event_stream(user_id):
+    """Stream chat, session and request events for one user."""
+    def stream():
+        q = event_broker.subscribe(user_id)
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    yield q.get(timeout=SSE_KEEPALIVE_SECONDS)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+        finally:
+            event_broker.unsubscribe(user_id, q)
+
+    return Response(stream(), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    })
+
+
+# --------------------------------
+# BACKGROUND JOBS
+# --------------------------------
+# Slow provider calls (Zoom, Gemini) can run as jobs: the route stores a job
+# in the Jobs collection, returns 202 with its id, and a worker pool runs it.
+# Handlers take JSON params and return (body, status_code) like a route.
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+# Finished jobs (and their idempotency keys) are kept this long, then expire
+JOB_RETENTION = timedelta(hours=float(os.getenv("JOB_RETENTION_HOURS", "168")))
+job_pool = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="job")
+JOB_HANDLERS = {}
+
+
+def job_handler(kind):
+    def register(fn):
+        JOB_HANDLERS[kind] = fn
+        return fn
+    return register
+
+
+def _serialize_job(job):
+    return {
+        "job_id": str(job["_id"]),
+        "kind": job["kind"],
+        "status": job["status"],
+        "status_code": job.get("status_code"),
+        "result": job.get("result"),
+        "error": job.get("error")
+    }
+
+
+def enqueue_job(kind, params, idempotency_key=None):
+    """Queue a job once per idempotency key and return its document.
+
+    Without an explicit key, one is derived from `kind` and `params`, so an
+    identical request attaches to the job while it is queued or running and
+    runs it again once it has finished. Failed jobs are always re-queued.
+    """
+    rerun_states = ["failed"]
+    if not idempotency_key:
+        rerun_states.append("succeeded")
+        idempotency_key = hashlib.sha256(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()
+    idempotency_key = f"{kind}:{idempotency_key}"
+    now = datetime.utcnow()
+    job = {
+        "_id": ObjectId(),
+        "kind": kind,
+        "idempotency_key": idempotency_key,
+        "params": params,
+        "status": "queued",
+        "created_at": now,
+        "updated_at": now
+    }
+
+    try:
+        existing = jobs_col.find_one_and_update(
+            {"idempotency_key": idempotency_key},
+            {"$setOnInsert": job},
+            upsert=True,
+            return_document=ReturnDocument.BEFORE
+        )
+    except DuplicateKeyError:
+        existing = jobs_col.find_one({"idempotency_key": idempotency_key})
+
+    if existing is None:
+        job_pool.submit(run_job, job["_id"])
+        return job
+
+    if existing["status"] in rerun_states:
+        retried = jobs_col.find_one_and_update(
+            {"_id": existing["_id"], "status": {"$in": rerun_states}},
+            {"$set": {"status": "queued", "updated_at": now},
+             "$unset": {"result": "", "error": "", "status_code": "", "expire_at": ""}},
+            return_document=ReturnDocument.AFTER
+        )
+        if retried:
+            job_pool.submit(run_job, retried["_id"])
+            return retried
+    return existing
+
+
+def run_job(job_id):
+    """Run one queued job and store its outcome."""
+    job = jobs_col.find_one_and_update(
+        {"_id": job_id, "status": "queued"},
+        {"$set": {"status": "running", "updated_at": datetime.utcnow()}},
+        return_document=ReturnDocument.AFTER
+    )
+    if not job:
+        return  # already picked up elsewhere
+
+    try:
+        body, status_code = JOB_HANDLERS[job["kind"]](job["params"])
+        update = {
+            "status": "succeeded" if status_code < 400 else "failed",
+            "status_code": status_code,
+            "result": body
+        }
+    except Exception as e:
+        print(f"Job {job_id} ({job['kind']}) error:", e)
+        update = {"status": "failed", "error": str(e)}
+
+    update["updated_at"] = datetime.utcnow()
+    update["expire_at"] = update["updated_at"] + JOB_RETENTION  # TTL index removes it then
+    jobs_col.update_one({"_id": job_id}, {"$set": update})
+
+
+def requeue_stale_jobs():
+    """Mark jobs left running by a stopped deployment as queued again.
+
+    Only safe while no process is running jobs, i.e. once before serving.
+    """
+    jobs_col.update_many({"status": "running"}, {"$set": {"status": "queued"}})
+
+
+def resume_jobs():
+    """Submit queued jobs to this process's pool.
+
+    Each worker may call this; run_job's atomic claim lets only one of them
+    run a given job.
+    """
+    for job in jobs_col.find({"status": "queued"}, {"_id": 1}):
+        job_pool.submit(run_job, job["_id"])
+
+
+def wants_async():
+    """True if the client asked for a job instead of waiting for the result."""
+    return request.args.get("async") == "1" or "respond-async" in request.headers.get("Prefer", "")
+
+
+def enqueue_job_response(kind, params):
+    job = enqueue_job(kind, params, request.headers.get("Idempotency-Key"))
+    body = _serialize_job(job)
+    body["status_url"] = f"/jobs/{body['job_id']}"
+    return jsonify(body), 202
+
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job_status(job_id):
+    if not ObjectId.is_valid(job_id):
+        return jsonify({"error": "Invalid job ID"}), 400
+
+    job = jobs_col.find_one({"_id": ObjectId(job_id)}, {"params": 0})
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+
+    return jsonify(_serialize_job(job)), 200
+
+
+# --------------------------------
+# BULK JOURNAL RE-SCORE
+# --------------------------------
+RESCORE_BATCH_SIZE = 500
+
+
+def _rescore_batch(batch):
+    """Decrypt and score a batch of (journal_id, cipher_text, patient_id, date)
+    in a pool worker; returns (journal_id, patient_id, date, mood, compound)."""
+    kept, texts = [], []
+    for journal_id, cipher_text, patient_id, day_str in batch:
+        try:
+            texts.append(decrypt_text(cipher_text))
+            kept.append((journal_id, patient_id, day_str))
+        except Exception:
+            continue  # undecryptable entries keep their old score
+    return [
+        (*entry, mood_data["mood"], mood_data["compound"])
+        for entry, mood_data in zip(kept, analyze_moods(texts))
+    ]
+
+
+def _stale_journal_batches(batch_size):
+    """Yield journals not scored with the current lexicon, in _id order."""
+    last_id = None
+    while True:
+        query = {"lexicon_version": {"$ne": LEXICON_VERSION}}
+        if last_id:
+            query["_id"] = {"$gt": last_id}
+        docs = list(journals_col.find(
+            query, {"entry": 1, "patient_id": 1, "date": 1}
+        ).sort("_id", 1).limit(batch_size))
+        if not docs:
+            return
+        last_id = docs[-1]["_id"]
+        yield [(d["_id"], d["entry"], d["patient_id"], d["date"]) for d in docs]
+
+
+def rescore_journals(workers=None, batch_size=RESCORE_BATCH_SIZE):
+    """Re-score every journal whose lexicon_version is stale.
+
+    Scoring runs across a process pool and results are written back with
+    bulk_write, to the mood rollups first and then to the entries. Each
+    written entry is stamped with LEXICON_VERSION, so an interrupted run
+    resumes where it stopped when started again.
+    """
+    get_sentiment_analyzer()  # load once so forked workers inherit it
+    done = 0
+    start = time.time()
+    with multiprocessing.Pool(workers) as pool:
+        for scored in pool.imap_unordered(_rescore_batch, _stale_journal_batches(batch_size)):
+            if not scored:
+                continue
+            mood_rollups_col.bulk_write([
+                op
+                for _, patient_id, day_str, mood, compound in scored
+                for op in _mood_rollup_ops(patient_id, day_str, mood, compound)
+            ], ordered=False)
+            journals_col.bulk_write([
+                UpdateOne({"_id": journal_id}, {"$set": {
+                    "mood": mood,
+                    "sentiment_score": compound,
+                    "lexicon_version": LEXICON_VERSION,
+                    "updated_at": datetime.utcnow()
+                }})
+                for journal_id, _, _, mood, compound in scored
+            ], ordered=False)
+            done += len(scored)
+            print(f"Re-scored {done} entries ({done / (time.time() - start):.0f} entries/sec)")
+
+    elapsed = time.time() - start
+    rate = done / elapsed if elapsed else 0
+    print(f"✅ Re-scored {done} journal entries in {elapsed:.1f}s ({rate:.0f} entries/sec)")
+    return done
+
+
+@app.cli.command("build-lexicon")
+def build_lexicon_command():
+    """Precompile the merged sentiment lexicon for offline workers."""
+    build_lexicon()
+    print("✅ Sentiment lexicon written to", LEXICON_PATH)
+
+
+@app.cli.command("bench-lexicon")
+@click.option("--repeat", type=int, default=5, show_default=True)
+def bench_lexicon_command(repeat):
+    """Compare analyzer startup from the raw VADER lexicon and from the pickle."""
+    load_lexicon()  # make sure the pickle exists and is current
+    start = time.perf_counter()
+    for _ in range(repeat):
+        raw = SentimentIntensityAnalyzer()
+        raw.lexicon.update(custom_words)
+    raw_ms = (time.perf_counter() - start) * 1000 / repeat
+    start = time.perf_counter()
+    for _ in range(repeat):
+        load_lexicon()
+    compiled_ms = (time.perf_counter() - start) * 1000 / repeat
+    print(f"raw lexicon {raw_ms:.1f} ms, precompiled {compiled_ms:.1f} ms ({raw_ms / compiled_ms:.1f}x)")
+
+
+@app.cli.command("rescore-journals")
+@click.option("--workers", type=int, default=None, help="Pool size (default: CPU count).")
+@click.option("--batch-size", type=int, default=RESCORE_BATCH_SIZE, show_default=True)
+def rescore_journals_command(workers, batch_size):
+    """Re-score journals written with an older sentiment lexicon."""
+    rescore_journals(workers, batch_size)
+
 
 # --------------------------------
 # PATIENT REGISTRATION
@@ -225,18 +1777,12 @@ def assign_patient_to_doctor():
         {"$set": {"assigned_doctor_id": ObjectId(doctor_id)}}
     )
 
-    # ✅ Add to DoctorPatients cluster
-    existing = doctor_patients_col.find_one({"doctor_id": ObjectId(doctor_id)})
-    if existing:
-        doctor_patients_col.update_one(
-            {"doctor_id": ObjectId(doctor_id)},
-            {"$addToSet": {"patients": ObjectId(patient_id)}}
-        )
-    else:
-        doctor_patients_col.insert_one({
-            "doctor_id": ObjectId(doctor_id),
-            "patients": [ObjectId(patient_id)]
-        })
+    # ✅ Add to DoctorPatients cluster (creates the doctor's record if missing)
+    doctor_patients_col.update_one(
+        {"doctor_id": ObjectId(doctor_id)},
+        {"$addToSet": {"patients": ObjectId(patient_id)}, "$set": {"updated_at": datetime.utcnow()}},
+        upsert=True
+    )
 
     return jsonify({"message": "Patient assigned to doctor successfully!"}), 200
 
@@ -258,7 +1804,9 @@ def get_doctor_details(doctor_id):
         "experience": doctor.get("experience", ""),
         "clinic_name": doctor.get("clinic_name", "")
     }
-    return jsonify(result), 200
+    # Legacy profiles without timestamps are validated by their content
+    stamp = doctor.get("updated_at") or doctor.get("created_at")
+    return conditional_json(stamp or result, lambda: result, max_age=60, last_modified=stamp)
 
 
 # --------------------------------
@@ -277,7 +1825,7 @@ def remove_assigned_doctor(patient_id):
     # Remove patient from doctor's list
     doctor_patients_col.update_one(
         {"doctor_id": ObjectId(doctor_id)},
-        {"$pull": {"patients": ObjectId(patient_id)}}
+        {"$pull": {"patients": ObjectId(patient_id)}, "$set": {"updated_at": datetime.utcnow()}}
     )
 
     # Unassign doctor from patient
@@ -299,21 +1847,25 @@ def get_patients_for_doctor(doctor_id):
         return jsonify({"message": "No patients assigned yet."}), 200
 
     patient_ids = record.get("patients", [])
-    patients = list(patients_col.find({"_id": {"$in": patient_ids}}))
-    result = [
-        {
-            "id": str(p["_id"]),
-            "name": p["name"],
-            "email": p["email"],
-            "age": p.get("age", ""),
-            "gender": p.get("gender", ""),
-            "profession": p.get("profession", ""),
-            "diagnosed": p.get("diagnosed", "")
-        }
-        for p in patients
-    ]
+    # The list changes with the membership or with any listed patient's profile
+    version = [record.get("updated_at"), collection_version(patients_col, {"_id": {"$in": patient_ids}})]
 
-    return jsonify(result), 200
+    def build():
+        patients = list(patients_col.find({"_id": {"$in": patient_ids}}))
+        return [
+            {
+                "id": str(p["_id"]),
+                "name": p["name"],
+                "email": p["email"],
+                "age": p.get("age", ""),
+                "gender": p.get("gender", ""),
+                "profession": p.get("profession", ""),
+                "diagnosed": p.get("diagnosed", "")
+            }
+            for p in patients
+        ]
+
+    return conditional_json(version, build, max_age=30)
 
 # --------------------------------
 # DOCTOR REGISTRATION
@@ -339,6 +1891,7 @@ def register_doctor():
     }
 
     doctors_col.insert_one(doctor)
+    invalidate_doctor_directory()
     return jsonify({"message": "Doctor registered successfully. Please log in."}), 201
 
 # --------------------------------
@@ -385,8 +1938,12 @@ def update_patient(patient_id):
         restricted_fields = ["_id", "assigned_doctor_id", "password", "email"]
         update_data = {
             k: v for k, v in data.items()
-            if k not in restricted_fields and v is not None
+            if k not in restricted_fields and v is not None and patient.get(k) != v
         }
+        # Only stamp updated_at (which moves list ETags) when a field changes
+        if not update_data:
+            return jsonify({"message": "No changes made."}), 200
+        update_data["updated_at"] = datetime.utcnow()
 
         # ✅ Update MongoDB document
         result = patients_col.update_one(
@@ -397,17 +1954,8 @@ def update_patient(patient_id):
         if result.modified_count == 0:
             return jsonify({"message": "No changes made."}), 200
 
-        # ✅ Get updated patient and clean non-serializable fields
-        updated_patient = patients_col.find_one({"_id": ObjectId(patient_id)})
-
-        # Remove non-serializable fields
-        if "password" in updated_patient:
-            del updated_patient["password"]
-
-        # Convert ObjectId to str
-        updated_patient["_id"] = str(updated_patient["_id"])
-        if "assigned_doctor_id" in updated_patient and updated_patient["assigned_doctor_id"]:
-            updated_patient["assigned_doctor_id"] = str(updated_patient["assigned_doctor_id"])
+        # ✅ Get updated patient (ids and dates are encoded by the JSON provider)
+        updated_patient = patients_col.find_one({"_id": ObjectId(patient_id)}, {"password": 0})
 
         return jsonify({
             "message": "Profile updated successfully.",
@@ -438,27 +1986,25 @@ def update_doctor(doctor_id):
         restricted_fields = {"_id", "email", "password"}
         update_data = {
             k: v for k, v in data.items()
-            if k not in restricted_fields and v is not None
+            if k not in restricted_fields and v is not None and doctor.get(k) != v
         }
+        # Only stamp updated_at (which moves list ETags) when a field changes
+        if not update_data:
+            return jsonify({"message": "No changes made."}), 200
+        update_data["updated_at"] = datetime.utcnow()
 
         # ✅ Apply update
         result = doctors_col.update_one(
             {"_id": ObjectId(doctor_id)},
             {"$set": update_data}
         )
+        invalidate_doctor_directory()
 
         if result.modified_count == 0:
             return jsonify({"message": "No changes made."}), 200
 
-        # ✅ Fetch updated record
-        updated_doctor = doctors_col.find_one({"_id": ObjectId(doctor_id)})
-
-        # ✅ Remove non-serializable fields
-        if "password" in updated_doctor:
-            del updated_doctor["password"]
-
-        # Convert ObjectId → str
-        updated_doctor["_id"] = str(updated_doctor["_id"])
+        # ✅ Fetch updated record (ids and dates are encoded by the JSON provider)
+        updated_doctor = doctors_col.find_one({"_id": ObjectId(doctor_id)}, {"password": 0})
 
         return jsonify({
             "message": "Doctor details updated successfully!",
@@ -470,6 +2016,172 @@ def update_doctor(doctor_id):
         return jsonify({"error": f"Internal server error: {str(e)}"}), 500
     
 
+# --------------------------------
+# MOOD ROLLUPS (daily / weekly / monthly)
+# --------------------------------
+# Journals are only kept for 7 days, so long-range mood trends are served
+# from MoodRollups. Each bucket keeps the day's mood/score under `days`
+# (so replacing today's entry is idempotent) and the derived counts and
+# sentiment mean/min/max are recomputed in the same update.
+MOODS = ["Happy", "Calm", "Neutral", "Sad", "Angry"]
+ROLLUP_GRANULARITIES = ("day", "week", "month")
+
+
+def rollup_bucket(day, granularity):
+    """Bucket label for a date; labels sort chronologically as strings."""
+    if granularity == "day":
+        return day.strftime("%Y-%m-%d")
+    if granularity == "week":
+        year, week, _ = day.isocalendar()
+        return f"{year}-W{week:02d}"
+    return day.strftime("%Y-%m")
+
+
+def _mood_rollup_ops(patient_id, day_str, mood, score):
+    day = datetime.strptime(day_str, "%Y-%m-%d")
+    ops = []
+    for granularity in ROLLUP_GRANULARITIES:
+        bucket = rollup_bucket(day, granularity)
+        ops.append(UpdateOne(
+            {"_id": f"{patient_id}:{granularity}:{bucket}"},
+            [
+                {"$set": {
+                    "patient_id": patient_id,
+                    "granularity": granularity,
+                    "bucket": bucket,
+                    f"days.{day_str}": {"mood": mood, "score": score}
+                }},
+                {"$set": {"_values": {"$map": {"input": {"$objectToArray": "$days"}, "in": "$$this.v"}}}},
+                {"$set": {
+                    "count": {"$size": "$_values"},
+                    "sentiment_mean": {"$avg": "$_values.score"},
+                    "sentiment_min": {"$min": "$_values.score"},
+                    "sentiment_max": {"$max": "$_values.score"},
+                    "mood_counts": {"$arrayToObject": {"$map": {
+                        "input": MOODS,
+                        "as": "m",
+                        "in": {"k": "$$m", "v": {"$size": {"$filter": {
+                            "input": "$_values", "cond": {"$eq": ["$$this.mood", "$$m"]}
+                        }}}}
+                    }}},
+                    "updated_at": "$$NOW"
+                }},
+                {"$unset": "_values"}
+            ],
+            upsert=True
+        ))
+    return ops
+
+
+def update_mood_rollups(patient_id, day_str, mood, score):
+    """Fold one journal entry into its day, week and month buckets (one round trip)."""
+    mood_rollups_col.bulk_write(_mood_rollup_ops(patient_id, day_str, mood, score), ordered=False)
+
+
+def backfill_mood_rollups():
+    """Build mood rollups from the journal entries currently stored.
+
+    Safe to re-run: each entry overwrites its own day in every bucket.
+    """
+    done = 0
+    ops = []
+    for e in journals_col.find({}, {"patient_id": 1, "date": 1, "mood": 1, "sentiment_score": 1}):
+        ops.extend(_mood_rollup_ops(e["patient_id"], e["date"], e.get("mood", "Neutral"), e.get("sentiment_score", 0)))
+        done += 1
+        if len(ops) >= 900:
+            mood_rollups_col.bulk_write(ops, ordered=False)
+            ops = []
+    if ops:
+        mood_rollups_col.bulk_write(ops, ordered=False)
+    return done
+
+
+@app.cli.command("backfill-mood-rollups")
+def backfill_mood_rollups_command():
+    """Rebuild mood rollups from stored journals (also run as migration 10)."""
+    print(f"✅ Rolled up {backfill_mood_rollups()} journal entries")
+
+
+# --------------------------------
+# JOURNAL RETENTION
+# --------------------------------
+# Entries are kept for JOURNAL_RETENTION_DAYS after their date. Each entry
+# carries its deadline: `expire_at`, which the TTL index deletes by itself,
+# or `archive_after` when JOURNAL_ARCHIVE=1, which the compaction worker
+# moves into JournalsArchive (zlib-compressed BSON) before deleting.
+JOURNAL_RETENTION_DAYS = int(os.getenv("JOURNAL_RETENTION_DAYS", "7"))
+JOURNAL_ARCHIVE = os.getenv("JOURNAL_ARCHIVE", "0") == "1"
+JOURNAL_COMPACTION_INTERVAL = int(os.getenv("JOURNAL_COMPACTION_INTERVAL", "3600"))
+JOURNAL_COMPACTION_BATCH = 500
+
+
+def journal_retention_fields(day_str):
+    """Retention deadline for an entry dated `day_str` (YYYY-MM-DD)."""
+    deadline = datetime.strptime(day_str, "%Y-%m-%d") + timedelta(days=JOURNAL_RETENTION_DAYS + 1)
+    return {"archive_after": deadline} if JOURNAL_ARCHIVE else {"expire_at": deadline}
+
+
+def compact_journals():
+    """Archive or delete expired journals in batches; returns how many were removed.
+
+    Also covers entries written before retention deadlines were stored.
+    """
+    now = datetime.utcnow()
+    cutoff = (now - timedelta(days=JOURNAL_RETENTION_DAYS)).strftime("%Y-%m-%d")
+    query = {"$or": [
+        {"archive_after": {"$lte": now}},
+        {"expire_at": {"$exists": False}, "archive_after": {"$exists": False}, "date": {"$lt": cutoff}}
+    ]}
+
+    removed = 0
+    while True:
+        batch = list(journals_col.find(query).limit(JOURNAL_COMPACTION_BATCH))
+        if not batch:
+            return removed
+        if JOURNAL_ARCHIVE:
+            archived = [{
+                "_id": e["_id"],
+                "patient_id": e.get("patient_id"),
+                "date": e.get("date"),
+                "archived_at": now,
+                "data": Binary(zlib.compress(bson.encode(e)))
+            } for e in batch]
+            try:
+                journals_archive_col.insert_many(archived, ordered=False)
+            except BulkWriteError as e:
+                # Already archived by an earlier interrupted run is fine
+                if any(err["code"] != 11000 for err in e.details.get("writeErrors", [])):
+                    raise
+        journals_col.delete_many({"_id": {"$in": [e["_id"] for e in batch]}})
+        removed += len(batch)
+
+
+def _compaction_loop():
+    while True:
+        try:
+            removed = compact_journals()
+            if removed:
+                print(f"🧹 Journal compaction removed {removed} expired entries")
+        except Exception as e:
+            print("Journal compaction error:", e)
+        time.sleep(JOURNAL_COMPACTION_INTERVAL)
+
+
+def start_journal_compaction():
+    """Run journal compaction periodically on a daemon thread."""
+    threading.Thread(target=_compaction_loop, name="journal-compaction", daemon=True).start()
+
+
+@app.cli.command("compact-journals")
+@click.option("--loop", is_flag=True, help="Keep compacting every JOURNAL_COMPACTION_INTERVAL seconds.")
+def compact_journals_command(loop):
+    """Archive or delete journals past the retention window."""
+    if loop:
+        _compaction_loop()  # runs until the process is stopped
+        return
+    print(f"✅ Removed {compact_journals()} expired journal entries")
+
+
 # --------------------------------
 # ✅ ADD OR REPLACE JOURNAL ENTRY (1 per day, replaces if exists)
 # --------------------------------
@@ -494,77 +2206,70 @@ def add_or_replace_journal_entry():
     mood_data = analyze_mood(entry_text)
     encrypted_entry = encrypt_text(entry_text)
 
-    # ✅ If journal exists today, replace it (update)
-    existing_entry = journals_col.find_one({
-        "patient_id": patient_id,
-        "date": today_str
-    })
-
-    if existing_entry:
-        journals_col.update_one(
-            {"_id": existing_entry["_id"]},
-            {
-                "$set": {
-                    "entry": encrypted_entry,
-                    "mood": mood_data["mood"],
-                    "sentiment_score": mood_data["compound"],
-                    "updated_at": datetime.utcnow()
-                }
-            }
-        )
-        action = "updated"
-    else:
-        # ✅ Insert new journal
-        journals_col.insert_one({
-            "patient_id": patient_id,
+    # ✅ Insert today's journal, or replace it if it exists (one atomic upsert)
+    now = datetime.utcnow()
+    journal_filter = {"patient_id": patient_id, "date": today_str}
+    journal_update = {
+        "$set": {
             "entry": encrypted_entry,
-            "date": today_str,
             "mood": mood_data["mood"],
             "sentiment_score": mood_data["compound"],
-            "created_at": datetime.utcnow()
-        })
+            "lexicon_version": LEXICON_VERSION,
+            "updated_at": now,
+            **journal_retention_fields(today_str)
+        },
+        "$setOnInsert": {"created_at": now}
+    }
+    try:
+        previous = journals_col.find_one_and_update(
+            journal_filter, journal_update, projection={"_id": 1}, upsert=True
+        )
+    except DuplicateKeyError:
+        # A concurrent request inserted today's entry first; replace it
+        previous = journals_col.find_one_and_update(
+            journal_filter, journal_update, projection={"_id": 1}
+        )
+
+    if previous:
+        journal_cache.pop(str(previous["_id"]))
+        action = "updated"
+    else:
         action = "added"
 
-    # ✅ Delete entries older than 7 days
-    seven_days_ago = (datetime.utcnow() - timedelta(days=7)).strftime("%Y-%m-%d")
-    journals_col.delete_many({
-        "patient_id": patient_id,
-        "date": {"$lt": seven_days_ago}
-    })
+    update_mood_rollups(patient_id, today_str, mood_data["mood"], mood_data["compound"])
+
+    # Old entries are removed by the TTL index / compaction worker, not here
 
     return jsonify({
         "message": f"Journal for today successfully {action} 🌿"
     }), 200
 
 
-
-# --------------------------------
-# ✅ GET ALL JOURNAL ENTRIES FOR A PATIENT (DECRYPTED)
-# --------------------------------
-@app.route('/journal/<patient_id>', methods=['GET'])
-def get_journals(patient_id):
-    try:
-        entries = list(journals_col.find({"patient_id": patient_id}))
-        if not entries:
-            return jsonify([]), 200
-
-        # Decrypt entries and prepare response
-        result = []
-        for e in entries:
-            try:
-                decrypted_entry = decrypt_text(e["entry"])
-            except Exception:
-                decrypted_entry = "(Error decrypting entry)"
-
-            result.append({
-                "_id": str(e["_id"]),
-                "date": e.get("date", ""),
-                "entry": decrypted_entry,
-                "mood": e.get("mood", ""),
-                "sentiment_score": e.get("sentiment_score", 0),
-            })
-
-        return jsonify(result), 200
+
+# --------------------------------
+# ✅ GET ALL JOURNAL ENTRIES FOR A PATIENT (DECRYPTED)
+# --------------------------------
+@app.route('/journal/<patient_id>', methods=['GET'])
+def get_journals(patient_id):
+    try:
+        def build():
+            entries = list(analytics_read(journals_col).find({"patient_id": patient_id}))
+
+            # Decrypt entries (cached / batched) and prepare response
+            result = []
+            for e, decrypted_entry in zip(entries, decrypt_journals(entries)):
+                result.append({
+                    "_id": str(e["_id"]),
+                    "date": e.get("date", ""),
+                    "entry": decrypted_entry,
+                    "mood": e.get("mood", ""),
+                    "sentiment_score": e.get("sentiment_score", 0),
+                })
+            return result
+
+        # Only the (count, newest write) pair is read unless the client is stale
+        version = collection_version(analytics_read(journals_col), {"patient_id": patient_id})
+        return conditional_json(version, build)
 
     except Exception as e:
         print("Error fetching journals:", e)
@@ -574,21 +2279,78 @@ def get_journals(patient_id):
 # --------------------------------
 # ✅ GET ALL DOCTORS (For Patients to View)
 # --------------------------------
+DOCTOR_PAGE_SIZE = 20
+DOCTOR_MAX_PAGE_SIZE = 100
+# Directory pages change only on doctor registration/update. Those bump a
+# generation stored in Mongo, and cached pages are keyed by it, so a write
+# served by one worker invalidates the pages cached by every worker.
+DOCTOR_DIRECTORY_GENERATION = "doctor_directory"
+doctor_directory_cache = LRUCache(256, ttl=int(os.getenv("DOCTOR_DIRECTORY_CACHE_TTL", "300")))
+
+
+def doctor_directory_generation():
+    doc = cache_generations_col.find_one({"_id": DOCTOR_DIRECTORY_GENERATION})
+    return doc["generation"] if doc else 0
+
+
+def invalidate_doctor_directory():
+    cache_generations_col.update_one(
+        {"_id": DOCTOR_DIRECTORY_GENERATION}, {"$inc": {"generation": 1}}, upsert=True
+    )
+    doctor_directory_cache.clear()  # this worker's stale pages can go now
+
+
 @app.route('/doctors', methods=['GET'])
 def get_all_doctors():
-    doctors = list(doctors_col.find({}, {"password": 0}))  # exclude passwords
-    result = [
-        {
-            "id": str(doc["_id"]),
-            "name": doc.get("name", ""),
-            "email": doc.get("email", ""),
-            "specialization": doc.get("specialization", ""),
-            "experience": doc.get("experience", ""),
-            "clinic_name": doc.get("clinic_name", "")
-        }
-        for doc in doctors
-    ]
-    return jsonify(result), 200
+    """One page of the doctor directory, ordered by _id.
+
+    Query params: limit, cursor (the previous page's next_cursor),
+    specialization (exact match) and q (word search on name/specialization).
+    """
+    try:
+        limit = min(int(request.args.get("limit", DOCTOR_PAGE_SIZE)), DOCTOR_MAX_PAGE_SIZE)
+    except ValueError:
+        return jsonify({"error": "Invalid 'limit'"}), 400
+    cursor = request.args.get("cursor")
+    specialization = request.args.get("specialization")
+    search = request.args.get("q", "").strip()
+    if limit < 1 or (cursor and not ObjectId.is_valid(cursor)):
+        return jsonify({"error": "Invalid 'limit' or 'cursor'"}), 400
+
+    cache_key = (doctor_directory_generation(), limit, cursor, specialization, search)
+    page = doctor_directory_cache.get(cache_key)
+    if page is not None:
+        return jsonify(page), 200
+
+    query = {}
+    if specialization:
+        query["specialization"] = specialization
+    if search:
+        query["$text"] = {"$search": search}
+    if cursor:
+        query["_id"] = {"$gt": ObjectId(cursor)}
+
+    projection = {"name": 1, "email": 1, "specialization": 1, "experience": 1, "clinic_name": 1}
+    doctors = list(doctors_col.find(query, projection).sort("_id", 1).limit(limit + 1))  # exclude passwords
+    has_more = len(doctors) > limit
+    doctors = doctors[:limit]
+
+    page = {
+        "doctors": [
+            {
+                "id": str(doc["_id"]),
+                "name": doc.get("name", ""),
+                "email": doc.get("email", ""),
+                "specialization": doc.get("specialization", ""),
+                "experience": doc.get("experience", ""),
+                "clinic_name": doc.get("clinic_name", "")
+            }
+            for doc in doctors
+        ],
+        "next_cursor": str(doctors[-1]["_id"]) if has_more else None
+    }
+    doctor_directory_cache.set(cache_key, page)
+    return jsonify(page), 200
 
 
 # --------------------------------
@@ -610,21 +2372,23 @@ def send_request_to_doctor():
     if not patient or not doctor:
         return jsonify({"error": "Invalid patient or doctor ID"}), 404
 
-    # Create or update request collection
-    requests_col = db["Requests"]
-    existing_request = requests_col.find_one({
-        "patient_id": ObjectId(patient_id),
-        "doctor_id": ObjectId(doctor_id)
-    })
+    # Create the request only if this pair has none yet (unique on patient_id + doctor_id)
+    try:
+        result = requests_col.update_one(
+            {"patient_id": ObjectId(patient_id), "doctor_id": ObjectId(doctor_id)},
+            {"$setOnInsert": {"status": "pending", "created_at": datetime.now()}},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        return jsonify({"message": "Request already sent."}), 200
 
-    if existing_request:
+    if result.upserted_id is None:
         return jsonify({"message": "Request already sent."}), 200
 
-    requests_col.insert_one({
-        "patient_id": ObjectId(patient_id),
-        "doctor_id": ObjectId(doctor_id),
-        "status": "pending",
-        "created_at": datetime.now()
+    publish_event([doctor_id], "request", {
+        "request_id": str(result.upserted_id),
+        "patient_id": patient_id,
+        "status": "pending"
     })
     return jsonify({"message": "Request sent successfully!"}), 201
 
@@ -634,15 +2398,21 @@ def send_request_to_doctor():
 # --------------------------------
 @app.route('/doctor/<doctor_id>/requests', methods=['GET'])
 def get_doctor_requests(doctor_id):
-    requests_col = db["Requests"]
     pending_requests = list(requests_col.find({
         "doctor_id": ObjectId(doctor_id),
         "status": "pending"
     }))
 
+    # Fetch all requesting patients in one query instead of one per request
+    patient_ids = list({req["patient_id"] for req in pending_requests})
+    patients_by_id = {
+        p["_id"]: p
+        for p in patients_col.find({"_id": {"$in": patient_ids}}, {"password": 0})
+    } if patient_ids else {}
+
     result = []
     for req in pending_requests:
-        patient = patients_col.find_one({"_id": req["patient_id"]})
+        patient = patients_by_id.get(req["patient_id"])
         if patient:
             result.append({
                 "request_id": str(req["_id"]),
@@ -663,7 +2433,6 @@ def get_doctor_requests(doctor_id):
 # --------------------------------
 @app.route('/doctor/approve_request/<request_id>', methods=['POST'])
 def approve_request(request_id):
-    requests_col = db["Requests"]
     request_doc = requests_col.find_one({"_id": ObjectId(request_id)})
 
     if not request_doc:
@@ -680,7 +2449,7 @@ def approve_request(request_id):
 
     doctor_patients_col.update_one(
         {"doctor_id": ObjectId(doctor_id)},
-        {"$addToSet": {"patients": ObjectId(patient_id)}},
+        {"$addToSet": {"patients": ObjectId(patient_id)}, "$set": {"updated_at": datetime.utcnow()}},
         upsert=True
     )
 
@@ -689,6 +2458,11 @@ def approve_request(request_id):
         {"_id": ObjectId(request_id)},
         {"$set": {"status": "approved"}}
     )
+    publish_event([patient_id, doctor_id], "request", {
+        "request_id": request_id,
+        "doctor_id": str(doctor_id),
+        "status": "approved"
+    })
 
     return jsonify({"message": "Request approved and patient assigned."}), 200
 
@@ -698,7 +2472,6 @@ def approve_request(request_id):
 # --------------------------------
 @app.route('/doctor/reject_request/<request_id>', methods=['POST'])
 def reject_request(request_id):
-    requests_col = db["Requests"]
     request_doc = requests_col.find_one({"_id": ObjectId(request_id)})
 
     if not request_doc:
@@ -708,6 +2481,11 @@ def reject_request(request_id):
         {"_id": ObjectId(request_id)},
         {"$set": {"status": "rejected"}}
     )
+    publish_event([request_doc["patient_id"], request_doc["doctor_id"]], "request", {
+        "request_id": request_id,
+        "doctor_id": str(request_doc["doctor_id"]),
+        "status": "rejected"
+    })
 
     return jsonify({"message": "Request rejected."}), 200
 
@@ -724,21 +2502,24 @@ def get_patient_mood_data(doctor_id, patient_id):
         if not doctor_record or ObjectId(patient_id) not in doctor_record.get("patients", []):
             return jsonify({"error": "Unauthorized access or patient not assigned"}), 403
 
-        # Get last 7 journal entries for that patient (sorted by date)
-        recent_entries = list(journals_col.find(
-            {"patient_id": patient_id}
-        ).sort("date", -1).limit(7))
+        # Rollups outlive the journals they summarize, so bound them to the last 7 days
+        since = (datetime.utcnow() - timedelta(days=7)).strftime("%Y-%m-%d")
+        recent_days = list(analytics_read(mood_rollups_col).find(
+            {"patient_id": patient_id, "granularity": "day", "bucket": {"$gte": since}},
+            {"bucket": 1, "days": 1}
+        ).sort("bucket", -1).limit(7))
 
-        if not recent_entries:
+        if not recent_days:
             return jsonify([]), 200
 
         # Prepare mood trend data
         result = []
-        for e in reversed(recent_entries):  # oldest first for left-to-right graph
+        for d in reversed(recent_days):  # oldest first for left-to-right graph
+            day = d.get("days", {}).get(d["bucket"], {})
             result.append({
-                "date": e.get("date", ""),
-                "mood": e.get("mood", "Neutral"),
-                "sentiment_score": e.get("sentiment_score", 0)
+                "date": d["bucket"],
+                "mood": day.get("mood", "Neutral"),
+                "sentiment_score": day.get("score", 0)
             })
 
         return jsonify(result), 200
@@ -748,6 +2529,98 @@ def get_patient_mood_data(doctor_id, patient_id):
         return jsonify({"error": str(e)}), 500
 
 
+# --------------------------------
+# ✅ COHORT MOOD ANALYTICS FOR ALL OF A DOCTOR'S PATIENTS
+# --------------------------------
+@app.route('/doctor/<doctor_id>/cohort/mood', methods=['GET'])
+def get_cohort_mood(doctor_id):
+    """Per-patient mood distribution, latest sentiment and 7-day trend in one aggregation.
+
+    Only mood/sentiment fields are read; journal text is never decrypted.
+    """
+    if not ObjectId.is_valid(doctor_id):
+        return jsonify({"error": "Invalid doctor ID"}), 400
+
+    since = (datetime.utcnow() - timedelta(days=7)).strftime("%Y-%m-%d")
+    # Equality lookups (localField/foreignField) use the _id and patient_date
+    # indexes on every server version; $expr lookups only do from MongoDB 5.0.
+    # Journals are retained for a short window, so the date filter runs on
+    # the joined array.
+    pipeline = [
+        {"$match": {"doctor_id": ObjectId(doctor_id)}},
+        {"$unwind": "$patients"},
+        {"$addFields": {"patient_key": {"$toString": "$patients"}}},
+        {"$lookup": {"from": patients_col.name, "localField": "patients", "foreignField": "_id", "as": "patient"}},
+        {"$lookup": {"from": journals_col.name, "localField": "patient_key", "foreignField": "patient_id", "as": "journals"}},
+        {"$project": {
+            "_id": 0,
+            "patient_id": "$patient_key",
+            "name": {"$ifNull": [{"$arrayElemAt": ["$patient.name", 0]}, ""]},
+            "trend": {"$map": {
+                "input": {"$filter": {"input": "$journals", "cond": {"$gte": ["$$this.date", since]}}},
+                "in": {"date": "$$this.date", "mood": "$$this.mood", "sentiment_score": "$$this.sentiment_score"}
+            }}
+        }},
+        {"$project": {
+            "patient_id": 1,
+            "name": 1,
+            "trend": 1,
+            "mood_distribution": {"$arrayToObject": {"$map": {
+                "input": MOODS,
+                "as": "m",
+                "in": {"k": "$$m", "v": {"$size": {"$filter": {
+                    "input": "$trend", "cond": {"$eq": ["$$this.mood", "$$m"]}
+                }}}}
+            }}}
+        }}
+    ]
+
+    try:
+        rows = list(analytics_read(doctor_patients_col).aggregate(pipeline))
+    except Exception as e:
+        print("Error fetching cohort mood:", e)
+        return jsonify({"error": str(e)}), 500
+
+    # At most 8 days per patient: order them here rather than in the pipeline
+    for row in rows:
+        row["trend"].sort(key=lambda day: day["date"])
+        row["latest_sentiment"] = row["trend"][-1].get("sentiment_score") if row["trend"] else None
+    return jsonify(rows), 200
+
+
+# --------------------------------
+# ✅ MOOD TREND OVER ANY RANGE (from rollups)
+# --------------------------------
+@app.route('/patient/<patient_id>/mood/trend', methods=['GET'])
+def get_mood_trend(patient_id):
+    """Mood counts and sentiment mean/min/max per day, week or month.
+
+    Query params: granularity (day|week|month, default day), start and end
+    as YYYY-MM-DD (default: the last 30 days). Reads one document per bucket.
+    """
+    granularity = request.args.get("granularity", "day")
+    if granularity not in ROLLUP_GRANULARITIES:
+        return jsonify({"error": "granularity must be day, week or month"}), 400
+
+    try:
+        end = datetime.strptime(request.args["end"], "%Y-%m-%d") if "end" in request.args else datetime.utcnow()
+        start = datetime.strptime(request.args["start"], "%Y-%m-%d") if "start" in request.args else end - timedelta(days=30)
+    except ValueError:
+        return jsonify({"error": "start and end must be YYYY-MM-DD"}), 400
+
+    buckets = analytics_read(mood_rollups_col).find(
+        {
+            "patient_id": patient_id,
+            "granularity": granularity,
+            "bucket": {"$gte": rollup_bucket(start, granularity), "$lte": rollup_bucket(end, granularity)}
+        },
+        {"_id": 0, "bucket": 1, "count": 1, "mood_counts": 1,
+         "sentiment_mean": 1, "sentiment_min": 1, "sentiment_max": 1}
+    ).sort("bucket", 1)
+
+    return jsonify(list(buckets)), 200
+
+
 
 # --------------------------------
 # ✅ SEND MESSAGE (Patient ↔ Doctor)
@@ -763,13 +2636,15 @@ def send_message():
     if not all([sender_id, receiver_id, sender_role, message]):
         return jsonify({"error": "Missing fields"}), 400
 
-    db["Messages"].insert_one({
+    message_doc = {
         "sender_id": ObjectId(sender_id),
         "receiver_id": ObjectId(receiver_id),
         "sender_role": sender_role,
         "message": message,
         "timestamp": datetime.utcnow()
-    })
+    }
+    messages_col.insert_one(message_doc)
+    publish_event([sender_id, receiver_id], "chat", _serialize_message(message_doc))
 
     return jsonify({"message": "Message sent successfully!"}), 201
 
@@ -777,27 +2652,97 @@ def send_message():
 # --------------------------------
 # ✅ FETCH CHAT (Patient ↔ Doctor)
 # --------------------------------
+def _conversation_filter(patient_id, doctor_id, extra=None):
+    """Build the $or filter matching both directions of a patient ↔ doctor chat.
+
+    `extra` is merged into each branch so range conditions stay on the
+    (sender_id, receiver_id, timestamp) index.
+    """
+    patient_oid, doctor_oid = ObjectId(patient_id), ObjectId(doctor_id)
+    branches = [
+        {"sender_id": patient_oid, "receiver_id": doctor_oid},
+        {"sender_id": doctor_oid, "receiver_id": patient_oid}
+    ]
+    if extra:
+        for branch in branches:
+            branch.update(extra)
+    return {"$or": branches}
+
+
+MESSAGE_FIELDS = {"sender_id": 1, "receiver_id": 1, "sender_role": 1, "message": 1, "timestamp": 1}
+
+
+def _serialize_message(m):
+    # ids are encoded by the JSON provider; the UI expects this timestamp format
+    return {**m, "timestamp": m["timestamp"].strftime("%Y-%m-%d %H:%M:%S")}
+
+
+CHAT_PAGE_SIZE = int(os.getenv("CHAT_PAGE_SIZE", "50"))
+CHAT_MAX_PAGE_SIZE = 200
+
+
+def _keyset_condition(message_id, direction):
+    """Range condition on (timestamp, _id) strictly after/before a message."""
+    anchor = messages_col.find_one({"_id": ObjectId(message_id)}, {"timestamp": 1})
+    if not anchor:
+        return None
+    op = "$gt" if direction == "after" else "$lt"
+    return {"$or": [
+        {"timestamp": {op: anchor["timestamp"]}},
+        {"timestamp": anchor["timestamp"], "_id": {op: anchor["_id"]}}
+    ]}
+
+
 @app.route('/chat/<patient_id>/<doctor_id>', methods=['GET'])
 def get_chat(patient_id, doctor_id):
-    messages = list(db["Messages"].find({
-        "$or": [
-            {"sender_id": ObjectId(patient_id), "receiver_id": ObjectId(doctor_id)},
-            {"sender_id": ObjectId(doctor_id), "receiver_id": ObjectId(patient_id)}
-        ]
-    }).sort("timestamp", 1))  # oldest → newest
+    """Return one page of the conversation, keyset-paginated on (timestamp, _id).
 
-    result = [
-        {
-            "_id": str(m["_id"]),
-            "sender_id": str(m["sender_id"]),
-            "receiver_id": str(m["receiver_id"]),
-            "sender_role": m["sender_role"],
-            "message": m["message"],
-            "timestamp": m["timestamp"].strftime("%Y-%m-%d %H:%M:%S")
-        }
-        for m in messages
-    ]
-    return jsonify(result), 200
+    - no cursor: the newest page
+    - `before=<message_id>`: the page just older than that message (scroll back)
+    - `after=<message_id>`: messages newer than what the client has seen
+      (incremental sync)
+
+    Messages in a page are ordered oldest → newest; `has_more` tells whether
+    another page exists in the requested direction.
+    """
+    try:
+        limit = min(int(request.args.get("limit", CHAT_PAGE_SIZE)), CHAT_MAX_PAGE_SIZE)
+    except ValueError:
+        return jsonify({"error": "Invalid 'limit'"}), 400
+    if limit < 1:
+        return jsonify({"error": "Invalid 'limit'"}), 400
+
+    after = request.args.get("after")
+    before = request.args.get("before")
+    extra = None
+    newer = bool(after)
+
+    cursor_id = after or before
+    if cursor_id:
+        if not ObjectId.is_valid(cursor_id):
+            return jsonify({"error": "Invalid message cursor"}), 400
+        extra = _keyset_condition(cursor_id, "after" if after else "before")
+        if extra is None:
+            return jsonify({"error": "Message not found"}), 404
+
+    order = ASCENDING if newer else DESCENDING
+    # Fetch one extra row to learn whether another page exists
+    messages = list(messages_col.find(
+        _conversation_filter(patient_id, doctor_id, extra), MESSAGE_FIELDS
+    ).sort([("timestamp", order), ("_id", order)]).limit(limit + 1))
+
+    if not messages:
+        return jsonify({"messages": [], "has_more": False}), 200
+
+    has_more = len(messages) > limit
+    messages = messages[:limit]
+    if not newer:
+        messages.reverse()  # oldest → newest
+
+    return jsonify({
+        "messages": [_serialize_message(m) for m in messages],
+        "has_more": has_more
+    }), 200
 
 
 # --------------------------------
@@ -824,7 +2769,7 @@ def create_session():
     if sessions_col.find_one({"patient_id": ObjectId(patient_id), "date": date, "time": time}):
         return jsonify({"error": "Patient already booked this slot"}), 400
 
-    sessions_col.insert_one({
+    result = sessions_col.insert_one({
         "doctor_id": ObjectId(doctor_id),
         "patient_id": ObjectId(patient_id),
         "date": date,
@@ -833,6 +2778,10 @@ def create_session():
         "created_by": created_by,
         "created_at": datetime.utcnow()
     })
+    publish_event([doctor_id, patient_id], "session", {
+        "session_id": str(result.inserted_id),
+        "status": "pending"
+    })
 
     return jsonify({"message": "Session request created successfully!"}), 201
 
@@ -853,18 +2802,70 @@ def get_sessions(role, user_id):
         return jsonify({"error": "Invalid user_id format"}), 400
 
     query = {"doctor_id": oid} if role == "doctor" else {"patient_id": oid}
-    
+    return conditional_json(_session_version(query), lambda: _session_list(query))
+
+
+def _session_version(query):
+    """Validator for a session list: the sessions plus the people they name.
+
+    Profile edits stamp updated_at on doctors and patients, so a renamed
+    doctor or patient changes the ETag just as a session write does. One
+    aggregation looks the stamps up next to the sessions.
+    """
+    def stamps(field):
+        return {"$map": {"input": f"${field}", "in": {"$ifNull": ["$$this.updated_at", "$$this.created_at"]}}}
+
+    rows = list(sessions_col.aggregate([
+        {"$match": query},
+        {"$group": {
+            "_id": None,
+            "count": {"$sum": 1},
+            "last": {"$max": {"$ifNull": ["$updated_at", "$created_at"]}},
+            "doctor_ids": {"$addToSet": "$doctor_id"},
+            "patient_ids": {"$addToSet": "$patient_id"}
+        }},
+        {"$lookup": {"from": doctors_col.name, "localField": "doctor_ids", "foreignField": "_id", "as": "doctors"}},
+        {"$lookup": {"from": patients_col.name, "localField": "patient_ids", "foreignField": "_id", "as": "patients"}},
+        {"$project": {"_id": 0, "count": 1, "last": 1, "doctors": stamps("doctors"), "patients": stamps("patients")}}
+    ]))
+    if not rows:
+        return 0, None
+    row = rows[0]
+    return [
+        row["count"], row["last"],
+        len(row["doctors"]), max(filter(None, row["doctors"]), default=None),
+        len(row["patients"]), max(filter(None, row["patients"]), default=None)
+    ]
+
+
+SESSION_FIELDS = {
+    "doctor_id": 1, "patient_id": 1, "date": 1, "time": 1,
+    "status": 1, "created_by": 1, "edit_request": 1
+}
+
+
+def _session_list(query):
     # Fetch sessions sorted by date
-    sessions = list(sessions_col.find(query).sort("date", 1))
+    sessions = list(sessions_col.find(query, SESSION_FIELDS).sort("date", 1))
+
+    # Resolve doctor and patient names with one batched query each
+    doctor_ids = list({s["doctor_id"] for s in sessions})
+    patient_ids = list({s["patient_id"] for s in sessions})
+    doctor_names = {
+        d["_id"]: d.get("name", "")
+        for d in doctors_col.find({"_id": {"$in": doctor_ids}}, {"name": 1})
+    } if doctor_ids else {}
+    patient_names = {
+        p["_id"]: p.get("name", "")
+        for p in patients_col.find({"_id": {"$in": patient_ids}}, {"name": 1})
+    } if patient_ids else {}
 
     result = []
     for s in sessions:
-        doctor = doctors_col.find_one({"_id": s["doctor_id"]}, {"name": 1})
-        patient = patients_col.find_one({"_id": s["patient_id"]}, {"name": 1})
         result.append({
-            "id": str(s["_id"]),
-            "doctor_name": doctor.get("name", "") if doctor else "",
-            "patient_name": patient.get("name", "") if patient else "",
+            "id": s["_id"],
+            "doctor_name": doctor_names.get(s["doctor_id"], ""),
+            "patient_name": patient_names.get(s["patient_id"], ""),
             "date": s.get("date", ""),
             "time": s.get("time", ""),
             "status": s.get("status", "pending"),
@@ -872,7 +2873,7 @@ def get_sessions(role, user_id):
             "edit_request": s.get("edit_request", {})
         })
 
-    return jsonify(result), 200
+    return result
 
 
 # --------------------------------
@@ -886,10 +2887,16 @@ def update_session_status(session_id):
     if status not in ["accepted", "rejected"]:
         return jsonify({"error": "Invalid status"}), 400
 
-    db["Sessions"].update_one(
+    session = sessions_col.find_one_and_update(
         {"_id": ObjectId(session_id)},
-        {"$set": {"status": status, "updated_at": datetime.utcnow()}}
+        {"$set": {"status": status, "updated_at": datetime.utcnow()}},
+        projection={"doctor_id": 1, "patient_id": 1}
     )
+    if session:
+        publish_event([session["doctor_id"], session["patient_id"]], "session", {
+            "session_id": session_id,
+            "status": status
+        })
 
     return jsonify({"message": f"Session {status} successfully!"}), 200
 
@@ -933,6 +2940,10 @@ def request_edit_session(session_id):
             "updated_at": datetime.utcnow()
         }}
     )
+    publish_event([session["doctor_id"], session["patient_id"]], "session", {
+        "session_id": session_id,
+        "status": "edit_requested"
+    })
 
     return jsonify({"message": "Edit request sent successfully!"}), 200
 
@@ -966,6 +2977,10 @@ def handle_edit_request_decision(session_id):
                 "edit_decided_by": decided_by
             }}
         )
+        publish_event([session["doctor_id"], session["patient_id"]], "session", {
+            "session_id": session_id,
+            "status": "accepted"
+        })
         return jsonify({"message": "Edit request accepted and session updated!"}), 200
     else:
         sessions_col.update_one(
@@ -976,17 +2991,181 @@ def handle_edit_request_decision(session_id):
                 "edit_decided_by": decided_by
             }, "$unset": {"edit_request": ""}}
         )
+        publish_event([session["doctor_id"], session["patient_id"]], "session", {
+            "session_id": session_id,
+            "status": "edit_rejected"
+        })
         return jsonify({"message": "Edit request rejected!"}), 200
     
 #---------------------
 #CHATBOT
 #---------------------
 
+# Per-user MindBuddy memory: the last CHATBOT_RECENT_TURNS messages are
+# kept verbatim and older ones are folded into a rolling summary, so the
+# prompt stays under CHATBOT_PROMPT_TOKEN_BUDGET however long the chat gets.
+# Stored text is encrypted like journal entries.
+CHATBOT_RECENT_TURNS = int(os.getenv("CHATBOT_RECENT_TURNS", "8"))
+CHATBOT_PROMPT_TOKEN_BUDGET = int(os.getenv("CHATBOT_PROMPT_TOKEN_BUDGET", "1500"))
+_fold_flight = SingleFlight()
+
+# Opt-in cache for replies to short openers ("hi", "I feel anxious today").
+# Openers are answered without memory and for a placeholder name, so one
+# reply serves every user; the name is filled in when it is served. Bump
+# CHAT_PROMPT_VERSION whenever build_chat_prompt's wording changes so stale
+# replies are not served.
+CHAT_PROMPT_VERSION = 2
+CHAT_NAME_SLOT = "{name}"
+CHATBOT_RESPONSE_CACHE = os.getenv("CHATBOT_RESPONSE_CACHE", "0") == "1"
+CHATBOT_CACHE_MAX_WORDS = int(os.getenv("CHATBOT_CACHE_MAX_WORDS", "4"))
+_opener_flight = SingleFlight()
+chatbot_response_cache = LRUCache(
+    int(os.getenv("CHATBOT_CACHE_SIZE", "1000")),
+    ttl=int(os.getenv("CHATBOT_CACHE_TTL", "3600"))
+)
+
+
+def normalize_prompt(text):
+    """Lowercase, drop punctuation/emoji and collapse whitespace."""
+    return " ".join(re.sub(r"[^\w\s']", " ", text.lower()).split())
+
+
+def chatbot_cache_key(user_input):
+    """Cache key for an opener of at most CHATBOT_CACHE_MAX_WORDS words, else None."""
+    normalized = normalize_prompt(user_input)
+    if not normalized or len(normalized.split()) > CHATBOT_CACHE_MAX_WORDS:
+        return None
+    return CHAT_PROMPT_VERSION, normalized
+
+
+def opener_reply(cache_key, user_input, user_name):
+    """Reply to an opener from the shared cache, generating it once on a miss."""
+    template = chatbot_response_cache.get(cache_key)
+    if template is None:
+        template = _opener_flight.do(
+            cache_key, lambda: generate_text(build_chat_prompt(CHAT_NAME_SLOT, user_input))
+        )
+        chatbot_response_cache.set(cache_key, template)
+    return template.replace(CHAT_NAME_SLOT, user_name)
+
+
+def estimate_tokens(text):
+    """Cheap token estimate (~4 characters per token)."""
+    return len(text) // 4 + 1
+
+
+def build_chat_prompt(user_name, user_input, summary="", turns=()):
+    """Build the MindBuddy prompt, fitting memory into the token budget."""
+    # Simplified prompt without quotes
+    header = (
+        f"You are a friendly mental health support buddy named 'MindBuddy'. "
+        f"Address the user by their first name and be empathetic and encouraging.\n\n"
+        f"User's name: {user_name}\n"
+    )
+    footer = (
+        f"User says: {user_input}\n\n"
+        f"Respond as a supportive and kind buddy."
+    )
+    if not summary and not turns:
+        return header + footer
+
+    budget = CHATBOT_PROMPT_TOKEN_BUDGET - estimate_tokens(header + footer)
+    memory = ""
+    # The summary may use at most half of what is left; keep its newest part
+    summary_chars = max(budget // 2, 0) * 4
+    summary = summary[-summary_chars:] if summary_chars else ""
+    if summary:
+        memory += f"Summary of your earlier conversation: {summary}\n\n"
+        budget -= estimate_tokens(memory)
+
+    recent = []
+    for turn in reversed(turns):  # newest first until the budget runs out
+        line = f"{user_name if turn['role'] == 'user' else 'MindBuddy'}: {turn['text']}\n"
+        budget -= estimate_tokens(line)
+        if budget < 0:
+            break
+        recent.append(line)
+    if recent:
+        memory += "Recent messages:\n" + "".join(reversed(recent)) + "\n"
+
+    return header + memory + footer
+
+
+def load_conversation(user_id):
+    """Return (summary, turns) with decrypted text for a user."""
+    return _decode_conversation(conversations_col.find_one({"_id": user_id}))
+
+
+def _decode_conversation(conv):
+    if not conv:
+        return "", []
+    summary = decrypt_text(conv["summary"]) if conv.get("summary") else ""
+    turns = [
+        {"id": t["id"], "role": t["role"], "text": decrypt_text(t["text"])}
+        for t in conv.get("turns", [])
+    ]
+    return summary, turns
+
+
+def record_turns(user_id, user_input, reply):
+    """Append a user/bot exchange and fold old turns once over the limit."""
+    conv = conversations_col.find_one_and_update(
+        {"_id": user_id},
+        {
+            "$push": {"turns": {"$each": [
+                {"id": ObjectId(), "role": "user", "text": encrypt_text(user_input)},
+                {"id": ObjectId(), "role": "bot", "text": encrypt_text(reply)}
+            ]}},
+            "$set": {"updated_at": datetime.utcnow()}
+        },
+        projection={"turns.id": 1},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    if len(conv.get("turns", [])) > CHATBOT_RECENT_TURNS:
+        background_pool.submit(fold_conversation, user_id)
+
+
+def fold_conversation(user_id):
+    """Merge turns beyond the most recent CHATBOT_RECENT_TURNS into the summary."""
+    def fold():
+        conv = conversations_col.find_one({"_id": user_id})
+        summary, turns = _decode_conversation(conv)
+        old_turns = turns[:-CHATBOT_RECENT_TURNS]
+        if not old_turns:
+            return
+
+        transcript = "\n".join(
+            f"{'User' if t['role'] == 'user' else 'MindBuddy'}: {t['text']}" for t in old_turns
+        )
+        new_summary = generate_text(
+            "Update the running summary of a supportive conversation between a user and "
+            "MindBuddy, a mental health support buddy. Keep feelings, concerns, names and "
+            f"commitments the user mentioned. Stay under {CHATBOT_PROMPT_TOKEN_BUDGET // 3} words.\n\n"
+            f"Current summary: {summary or '(none)'}\n\n"
+            f"New messages:\n{transcript}\n\n"
+            "Updated summary:"
+        )
+
+        # Only apply if no other fold (in any worker) changed the summary
+        # meanwhile: the stored ciphertext we read is the version check
+        conversations_col.update_one({"_id": user_id, "summary": conv.get("summary")}, {
+            "$set": {"summary": encrypt_text(new_summary)},
+            "$pull": {"turns": {"id": {"$in": [t["id"] for t in old_turns]}}}
+        })
+
+    try:
+        _fold_flight.do(user_id, fold)
+    except Exception as e:
+        print("Conversation fold error:", e)
+
+
 @app.route("/gemini", methods=["POST"])
 def gemini_chat():
     data = request.get_json()
     user_input = data.get("prompt")
     user_name = data.get("name", "friend")
+    user_id = data.get("user_id")  # optional: enables server-side memory
 
     if not user_input:
         return jsonify({"error": "Prompt is required"}), 400
@@ -997,30 +3176,86 @@ def gemini_chat():
     if not os.getenv("GEMINI_API_KEY"):
         return jsonify({"error": "GEMINI_API_KEY not set on server."}), 500
 
-    # Simplified prompt without quotes
-    prompt = (
-        f"You are a friendly mental health support buddy named 'MindBuddy'. "
-        f"Address the user by their first name and be empathetic and encouraging.\n\n"
-        f"User's name: {user_name}\n"
-        f"User says: {user_input}\n\n"
-        f"Respond as a supportive and kind buddy."
-    )
+    # Openers are answered from the shared cache whatever the user's memory
+    cache_key = chatbot_cache_key(user_input) if CHATBOT_RESPONSE_CACHE else None
+    if cache_key:
+        try:
+            reply = opener_reply(cache_key, user_input, user_name)
+        except LLMBusy:
+            raise
+        except Exception as e:
+            print("Gemini API Error:", e)
+            return jsonify({"error": "Failed to generate response. " + str(e)}), 500
+        if user_id:
+            record_turns(user_id, user_input, reply)
+        if data.get("stream"):
+            return Response(reply, mimetype="text/plain", headers={"Cache-Control": "no-cache"})
+        return jsonify({"response": reply}), 200
+
+    summary, turns = load_conversation(user_id) if user_id else ("", [])
+    prompt = build_chat_prompt(user_name, user_input, summary, turns)
+
+    if data.get("stream"):
+        # Send tokens as they arrive; the slot is released when the stream closes
+        acquire_llm_slot()
+
+        def chunks():
+            parts = []
+            try:
+                for text in stream_text(prompt):
+                    parts.append(text)
+                    yield text
+            except Exception as e:
+                print("Gemini API Error:", e)
+                return
+            reply = "".join(parts).strip()
+            if user_id and reply:
+                record_turns(user_id, user_input, reply)
+
+        response = Response(chunks(), mimetype="text/plain", headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"
+        })
+        response.call_on_close(release_llm_slot)
+        return response
 
     try:
-        client = genai.Client()  # API key loaded via env var
-
-        response = client.models.generate_content(
-            model="gemini-2.5-flash",
-            contents=prompt
-        )
-
-        return jsonify({"response": response.text.strip()}), 200
+        reply = generate_text(prompt)
+        if user_id:
+            record_turns(user_id, user_input, reply)
+        return jsonify({"response": reply}), 200
 
+    except LLMBusy:
+        raise
     except Exception as e:
         print("Gemini API Error:", e)
         return jsonify({"error": "Failed to generate response. " + str(e)}), 500
 
 
+@app.route("/db/pool/stats", methods=["GET"])
+def mongo_pool_stats():
+    """Connection pool checkout wait times for this process."""
+    return jsonify({
+        "checkout_wait_seconds": mongo_pool_listener.wait.snapshot(),
+        "checkout_timeouts": metrics.value("mongo_pool_checkout_timeouts_total"),
+        "options": MONGO_POOL_OPTIONS,
+        "analytics_read_preference": analytics_read_preference.mongos_mode,
+    }), 200
+
+
+@app.route("/gemini/cache/stats", methods=["GET"])
+def chatbot_cache_stats():
+    stats = chatbot_response_cache.stats()
+    stats["enabled"] = CHATBOT_RESPONSE_CACHE
+    return jsonify(stats), 200
+
+
+@app.route("/gemini/conversation/<user_id>", methods=["DELETE"])
+def clear_chatbot_conversation(user_id):
+    conversations_col.delete_one({"_id": user_id})
+    return jsonify({"message": "Conversation cleared."}), 200
+
+
 # --------------------------------
 # ✅ GET TODAY'S MOOD FOR A PATIENT
 # --------------------------------
@@ -1071,8 +3306,6 @@ def add_or_update_report():
         return jsonify({"error": "Missing report fields"}), 400
 
     today_str = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
-    
-    existing_report = reports_col.find_one({"patient_id": patient_id})
 
     report_data = {
         "title": title,
@@ -1081,17 +3314,21 @@ def add_or_update_report():
         "updated_at": today_str
     }
 
-    if existing_report:
-        reports_col.update_one(
-            {"_id": existing_report["_id"]},
-            {"$set": report_data}
+    # One atomic upsert (unique on patient_id); the pre-image tells added vs updated
+    report_update = {"$set": report_data, "$setOnInsert": {"created_at": today_str}}
+    try:
+        existing_report = reports_col.find_one_and_update(
+            {"patient_id": patient_id}, report_update, projection={"_id": 1}, upsert=True
         )
-        action = "updated"
-    else:
-        report_data["patient_id"] = patient_id
-        report_data["created_at"] = today_str
-        reports_col.insert_one(report_data)
-        action = "added"
+    except DuplicateKeyError:
+        existing_report = reports_col.find_one_and_update(
+            {"patient_id": patient_id}, report_update, projection={"_id": 1}
+        )
+    action = "updated" if existing_report else "added"
+
+    # Drop summaries of the old content and start generating the new one
+    summaries_col.delete_many({"patient_id": patient_id})
+    background_pool.submit(precompute_report_summary, patient_id)
 
     return jsonify({"message": f"Report {action} successfully!"}), 200
 
@@ -1109,16 +3346,21 @@ def get_report(patient_id):
     if not report:
         return jsonify({"message": "No report found for this patient."}), 404
 
-    return jsonify({
-        "patient_id": report["patient_id"],
-        "report": {
-            "title": report.get("title"),
-            "summary": report.get("summary"),
-            "details": report.get("details")
-        },
-        "created_at": report.get("created_at"),
-        "updated_at": report.get("updated_at")
-    }), 200
+    def build():
+        return {
+            "patient_id": report["patient_id"],
+            "report": {
+                "title": report.get("title"),
+                "summary": report.get("summary"),
+                "details": report.get("details")
+            },
+            "created_at": report.get("created_at"),
+            "updated_at": report.get("updated_at")
+        }
+
+    # updated_at only has second precision, so the content hash backs it up
+    version = [report.get("updated_at"), report_content_hash(report)]
+    return conditional_json(version, build, last_modified=parse_stamp(report.get("updated_at")))
 
 # --------------------------------
 # CREATE ZOOM ACCESS TOKEN
@@ -1127,9 +3369,56 @@ ACCOUNT_ID = os.getenv("ZOOM_ACCOUNT_ID")
 CLIENT_ID = os.getenv("ZOOM_CLIENT_ID")
 CLIENT_SECRET = os.getenv("ZOOM_CLIENT_SECRET")
 
+# Overridable so the Zoom flow can be exercised against a local stub server
+ZOOM_OAUTH_URL = os.getenv("ZOOM_OAUTH_URL", "https://zoom.us/oauth/token")
+ZOOM_API_URL = os.getenv("ZOOM_API_URL", "https://api.zoom.us/v2")
+ZOOM_TIMEOUT = (3.05, float(os.getenv("ZOOM_READ_TIMEOUT", "10")))  # (connect, read)
+ZOOM_TOKEN_REFRESH_MARGIN = 60  # seconds before expires_in to fetch a new token
 
-def get_zoom_token():
-    url = f"https://zoom.us/oauth/token?grant_type=account_credentials&account_id={ACCOUNT_ID}"
+class ZoomRetry(Retry):
+    """Retry policy for Zoom calls.
+
+    Connection errors are always retried (the request never reached Zoom).
+    GETs are also retried on 429 and gateway errors, but a POST such as
+    meeting creation only on 429: after a 502/504 Zoom may already have
+    created the meeting, and a retry would create a duplicate.
+    """
+
+    def is_retry(self, method, status_code, has_retry_after=False):
+        if method == "POST" and status_code != 429:
+            return False
+        return super().is_retry(method, status_code, has_retry_after)
+
+
+_zoom_http = None
+_zoom_http_lock = threading.Lock()
+
+
+def get_zoom_http():
+    """One pooled session per process for all Zoom traffic (see ZoomRetry)."""
+    global _zoom_http
+    if _zoom_http is None:
+        with _zoom_http_lock:
+            if _zoom_http is None:
+                session = requests.Session()
+                session.mount("https://", HTTPAdapter(pool_maxsize=10, max_retries=ZoomRetry(
+                    total=3,
+                    read=0,
+                    backoff_factor=0.3,
+                    status_forcelist=[429, 502, 503, 504],
+                    allowed_methods=frozenset(["GET", "POST"]),
+                    raise_on_status=False
+                )))
+                session.mount("http://", session.get_adapter("https://"))
+                _zoom_http = session
+    return _zoom_http
+
+_zoom_token = None  # {"value": str, "expires_at": float}
+_zoom_token_lock = threading.Lock()
+
+
+def _fetch_zoom_token():
+    url = f"{ZOOM_OAUTH_URL}?grant_type=account_credentials&account_id={ACCOUNT_ID}"
 
     auth_header = base64.b64encode(f"{CLIENT_ID}:{CLIENT_SECRET}".encode()).decode()
 
@@ -1138,14 +3427,68 @@ def get_zoom_token():
         "Content-Type": "application/x-www-form-urlencoded",
     }
 
-    res = requests.post(url, headers=headers)
+    with timed_call("zoom", "token"):
+        res = get_zoom_http().post(url, headers=headers, timeout=ZOOM_TIMEOUT)
 
     if res.status_code != 200:
         print("Zoom Token Error:", res.text)
         return None
 
     data = res.json()
-    return data["access_token"]
+    return {
+        "value": data["access_token"],
+        "expires_at": time.time() + data.get("expires_in", 3600) - ZOOM_TOKEN_REFRESH_MARGIN
+    }
+
+
+def get_zoom_token():
+    """Return a cached access token, refreshing it once when it is about to expire.
+
+    Concurrent callers wait on the lock and reuse the refreshed token
+    instead of each making their own OAuth call.
+    """
+    global _zoom_token
+    token = _zoom_token
+    if token and token["expires_at"] > time.time():
+        return token["value"]
+
+    with _zoom_token_lock:
+        token = _zoom_token
+        if token and token["expires_at"] > time.time():
+            return token["value"]
+        token = _fetch_zoom_token()
+        _zoom_token = token
+    return token["value"] if token else None
+
+
+def invalidate_zoom_token(value):
+    """Forget `value` if it is still the cached token (e.g. after a 401)."""
+    global _zoom_token
+    with _zoom_token_lock:
+        if _zoom_token and _zoom_token["value"] == value:
+            _zoom_token = None
+
+
+def request_zoom_meeting(payload):
+    """Create a Zoom meeting and return Zoom's JSON, or None if no token could be obtained."""
+    for attempt in range(2):
+        token = get_zoom_token()
+        if not token:
+            return None
+
+        headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
+        with timed_call("zoom", "create_meeting"):
+            response = get_zoom_http().post(
+                f"{ZOOM_API_URL}/users/me/meetings",
+                headers=headers,
+                json=payload,
+                timeout=ZOOM_TIMEOUT
+            )
+        if response.status_code == 401 and attempt == 0:
+            # Token revoked or expired early: refresh once and retry
+            invalidate_zoom_token(token)
+            continue
+        return response.json()
 
 
 # --------------------------------
@@ -1154,18 +3497,20 @@ def get_zoom_token():
 @app.route("/create_zoom_meeting", methods=["POST"])
 def create_zoom_meeting():
     data = request.json
+    if wants_async():
+        return enqueue_job_response("create_zoom_meeting", data)
+
+    body, status = _create_zoom_meeting(data)
+    return jsonify(body), status
 
+
+@job_handler("create_zoom_meeting")
+def _create_zoom_meeting(data):
     topic = data.get("topic", "Therapy Session")
     start_time = data.get("start_time")
     doctor_id = data.get("doctor_id")
     patient_id = data.get("patient_id")
 
-    token = get_zoom_token()      # <-- FIXED
-    if not token:
-        return jsonify({"error": "Failed to generate Zoom token"}), 500
-
-    url = "https://api.zoom.us/v2/users/me/meetings"
-
     payload = {
         "topic": topic,
         "type": 2,
@@ -1177,16 +3522,16 @@ def create_zoom_meeting():
         }
     }
 
-    headers = {
-        "Authorization": f"Bearer {token}",
-        "Content-Type": "application/json"
-    }
-
-    response = requests.post(url, headers=headers, json=payload)
-    zoom_data = response.json()
+    try:
+        zoom_data = request_zoom_meeting(payload)
+    except requests.RequestException as e:
+        print("Zoom API Error:", e)
+        return {"error": "Zoom API unreachable"}, 502
+    if zoom_data is None:
+        return {"error": "Failed to generate Zoom token"}, 500
 
     if "join_url" not in zoom_data:
-        return jsonify({"error": "Zoom API error", "details": zoom_data}), 500
+        return {"error": "Zoom API error", "details": zoom_data}, 500
 
     join_link = zoom_data["join_url"]
 
@@ -1198,10 +3543,10 @@ def create_zoom_meeting():
         "created_at": time.time()
     })
 
-    return jsonify({
+    return {
         "message": "Zoom meeting created",
         "join_url": join_link
-    }), 200
+    }, 200
 
 # --------------------------------
 # START ZOOM SESSION
@@ -1213,7 +3558,7 @@ def start_session(session_id):
     except:
         return jsonify({"error": "Invalid session ID"}), 400
 
-    session = sessions_col.find_one({"_id": obj_id})
+    session = sessions_col.find_one({"_id": obj_id}, {"meeting_link": 1})
     if not session:
         return jsonify({"error": "Session not found"}), 404
 
@@ -1221,11 +3566,24 @@ def start_session(session_id):
     if session.get("meeting_link"):
         return jsonify({"join_url": session["meeting_link"]}), 200
 
-    token = get_zoom_token()
-    if not token:
-        return jsonify({"error": "Failed to generate Zoom token"}), 500
+    if wants_async():
+        return enqueue_job_response("start_session", {"session_id": session_id})
+
+    body, status = _start_session({"session_id": session_id})
+    return jsonify(body), status
+
+
+@job_handler("start_session")
+def _start_session(params):
+    obj_id = ObjectId(params["session_id"])
+
+    # Re-check: another request may have created the meeting meanwhile
+    session = sessions_col.find_one({"_id": obj_id}, {"meeting_link": 1})
+    if not session:
+        return {"error": "Session not found"}, 404
+    if session.get("meeting_link"):
+        return {"join_url": session["meeting_link"]}, 200
 
-    url = "https://api.zoom.us/v2/users/me/meetings"
     payload = {
         "topic": "Therapy Session",
         "type": 2,
@@ -1235,36 +3593,49 @@ def start_session(session_id):
             "waiting_room": False
         }
     }
-    headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
-
-    response = requests.post(url, headers=headers, json=payload)
-    zoom_data = response.json()
+    try:
+        zoom_data = request_zoom_meeting(payload)
+    except requests.RequestException as e:
+        print("Zoom API Error:", e)
+        return {"error": "Zoom API unreachable"}, 502
+    if zoom_data is None:
+        return {"error": "Failed to generate Zoom token"}, 500
 
     if "join_url" not in zoom_data:
-        return jsonify({"error": "Zoom API error", "details": zoom_data}), 500
+        return {"error": "Zoom API error", "details": zoom_data}, 500
 
     join_url = zoom_data["join_url"]
 
     sessions_col.update_one(
         {"_id": obj_id},
-        {"$set": {"meeting_link": join_url}}
+        {"$set": {"meeting_link": join_url, "updated_at": datetime.utcnow()}}
     )
 
-    return jsonify({"join_url": join_url}), 200
+    return {"join_url": join_url}, 200
 
 
 
 # -------------------------------- 
 # REPORT SUMMARY
 # --------------------------------
-@app.route("/report/summary/<patient_id>", methods=["GET"])
-def report_summary(patient_id):
-    """Fetch the report, send it to Gemini AI, and return a concise summary + recommendations in points."""
-    
-    report = reports_col.find_one({"patient_id": patient_id})
-    if not report:
-        return jsonify({"error": "No report found for this patient."}), 404
+SUMMARY_PROMPT_VERSION = 1
+_summary_flight = SingleFlight()
 
+
+def report_content_hash(report):
+    """Hash everything the generated summary depends on."""
+    content = json.dumps([
+        SUMMARY_PROMPT_VERSION,
+        GEMINI_MODEL,
+        report.get("title"),
+        report.get("summary"),
+        report.get("details")
+    ])
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def generate_report_summary(report):
+    """Send the report to Gemini AI and split the answer into summary + recommendations."""
     report_text = f"""
     Title: {report.get('title', 'No Title')}
     Summary: {report.get('summary', 'No Summary')}
@@ -1280,55 +3651,139 @@ def report_summary(patient_id):
         f"Patient Report:\n{report_text}"
     )
 
+    full_text = generate_text(prompt)
+    summary_text = ""
+    recommendations_text = ""
+
+    # Robust splitting logic
+    if "Summary:" in full_text and "Recommendations:" in full_text:
+        summary_text = full_text.split("Summary:", 1)[1].split("Recommendations:", 1)[0].strip()
+        recommendations_text = full_text.split("Recommendations:", 1)[1].strip()
+    elif "Summary:" in full_text:
+        summary_text = full_text.split("Summary:", 1)[1].strip()
+        lines = full_text.split("\n")
+        recommendations_text = "\n".join(lines[-3:]).strip()
+    else:
+        lines = [line.strip() for line in full_text.split("\n") if line.strip()]
+        mid = len(lines)//2
+        summary_text = "\n".join(lines[:mid])
+        recommendations_text = "\n".join(lines[mid:])
+
+    # Fallbacks
+    if not summary_text:
+        summary_text = "Summary not generated. Please review the report manually."
+    if not recommendations_text:
+        recommendations_text = "No recommendations generated. Encourage patient positively."
+
+    # Return in React-compatible keys
+    return {
+        "summary": summary_text,
+        "recommendations": recommendations_text
+    }
+
+
+def get_report_summary(report):
+    """Return the cached summary for this exact report content, generating it once if missing.
+
+    Concurrent callers for the same content share a single LLM call.
+    """
+    content_hash = report_content_hash(report)
+
+    def load_or_generate():
+        cached = summaries_col.find_one({"_id": content_hash})
+        if cached:
+            return {"summary": cached["summary"], "recommendations": cached["recommendations"]}
+
+        result = generate_report_summary(report)
+        summaries_col.replace_one({"_id": content_hash}, {
+            "patient_id": report["patient_id"],
+            "summary": result["summary"],
+            "recommendations": result["recommendations"],
+            "generated_at": datetime.utcnow()
+        }, upsert=True)
+        return result
+
+    return _summary_flight.do(content_hash, load_or_generate)
+
+
+def precompute_report_summary(patient_id):
+    """Warm the summary cache right after a report is written."""
     try:
-        client = genai.Client()
-        response = client.models.generate_content(
-            model="gemini-2.5-flash",
-            contents=prompt
-        )
+        report = reports_col.find_one({"patient_id": patient_id})
+        if report:
+            get_report_summary(report)
+    except Exception as e:
+        print("Summary precompute error:", e)
 
-        full_text = response.text.strip()
-        summary_text = ""
-        recommendations_text = ""
-
-        # Robust splitting logic
-        if "Summary:" in full_text and "Recommendations:" in full_text:
-            summary_text = full_text.split("Summary:", 1)[1].split("Recommendations:", 1)[0].strip()
-            recommendations_text = full_text.split("Recommendations:", 1)[1].strip()
-        elif "Summary:" in full_text:
-            summary_text = full_text.split("Summary:", 1)[1].strip()
-            lines = full_text.split("\n")
-            recommendations_text = "\n".join(lines[-3:]).strip()
-        else:
-            lines = [line.strip() for line in full_text.split("\n") if line.strip()]
-            mid = len(lines)//2
-            summary_text = "\n".join(lines[:mid])
-            recommendations_text = "\n".join(lines[mid:])
-
-        # Fallbacks
-        if not summary_text:
-            summary_text = "Summary not generated. Please review the report manually."
-        if not recommendations_text:
-            recommendations_text = "No recommendations generated. Encourage patient positively."
-
-        # Return in React-compatible keys
-        result = {
-            "summary": summary_text,
-            "recommendations": recommendations_text
-        }
 
-        return jsonify(result), 200
+@app.route("/report/summary/<patient_id>", methods=["GET"])
+def report_summary(patient_id):
+    """Return a concise summary + recommendations in points for the patient's report."""
+    if wants_async():
+        return enqueue_job_response("report_summary", {"patient_id": patient_id})
+
+    body, status = _report_summary({"patient_id": patient_id})
+    return jsonify(body), status
+
+
+@job_handler("report_summary")
+def _report_summary(params):
+    report = analytics_read(reports_col).find_one({"patient_id": params["patient_id"]})
+    if not report:
+        return {"error": "No report found for this patient."}, 404
+
+    try:
+        return get_report_summary(report), 200
 
+    except LLMBusy:
+        raise
     except Exception as e:
         print("Gemini API Error:", e)
-        return jsonify({"error": "Failed to generate AI summary: " + str(e)}), 500
+        return {"error": "Failed to generate AI summary: " + str(e)}, 500
 
 
 
 # --------------------------------
 # RUN SERVER
 # --------------------------------
+def prepare_deployment():
+    """Once-per-deployment startup: index migrations, stale job recovery and
+    the sentiment lexicon (rebuilt only if missing or outdated), so workers
+    never build it on a request."""
+    if os.getenv("MIGRATE_ON_STARTUP", "1") == "1":
+        run_migrations()
+    requeue_stale_jobs()
+    load_lexicon()
+
+
+@app.cli.command("prepare")
+def prepare_command():
+    """Run once-per-deployment startup tasks (used by the gunicorn config)."""
+    prepare_deployment()
+    print("✅ Deployment prepared")
+
+
+def create_app(prepare=True, background=True):
+    """Finish starting this process and return the WSGI app.
+
+    The single-process dev server does everything here. Under gunicorn
+    (see gunicorn.conf.py) the master runs `flask prepare` and the
+    compaction loop as separate processes before forking, and each worker
+    calls create_app(prepare=False, background=False) after the fork, so
+    Mongo, Gemini and Zoom clients are created lazily inside the worker.
+    """
+    if prepare:
+        prepare_deployment()
+    if metrics.directory:
+        metrics.share(METRICS_WRITE_SECONDS)
+    resume_jobs()
+    if background:
+        start_journal_compaction()
+    return app
+
+
 if __name__ == '__main__':
     print("✅ Connected to:", db.name)
     print("📂 Collections:", db.list_collection_names())
+    create_app()
     app.run(debug=True)
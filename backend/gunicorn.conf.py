@@ -0,0 +1,74 @@
+"""Gunicorn settings for serving the backend in production.
+
+    cd backend && gunicorn -c gunicorn.conf.py
+
+Each worker imports the app after the fork (preload_app is off), so every
+worker opens its own MongoClient, Gemini client and Zoom session. Tasks
+that must run once per deployment (migrations, stale job recovery) and the
+journal compaction loop run in separate processes started by the master.
+SSE events reach streams on every worker through the capped Events
+collection (EVENT_BROKER=mongo, the default), and /metrics sums the files
+the workers write to METRICS_DIR.
+"""
+import multiprocessing
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+FLASK = [sys.executable, "-m", "flask", "--app", "app"]
+
+wsgi_app = "wsgi:app"
+
+# Workers inherit this from the master; unless it was given, it belongs to
+# this master and is removed when it exits
+_own_metrics_dir = "METRICS_DIR" not in os.environ
+METRICS_DIR = os.environ.setdefault(
+    "METRICS_DIR", os.path.join(tempfile.gettempdir(), f"mindlink-metrics-{os.getpid()}")
+)
+
+bind = os.getenv("BIND", "0.0.0.0:5000")
+
+# gevent workers: an open SSE stream or a blocking call (Mongo, Gemini,
+# Zoom) holds a greenlet, not a thread, so long-lived streams cannot starve
+# the worker; bcrypt and decryption still run on native threads. With
+# WEB_WORKER_CLASS=gthread every stream pins one of WEB_THREADS threads.
+worker_class = os.getenv("WEB_WORKER_CLASS", "gevent")
+workers = int(os.getenv("WEB_WORKERS", str(multiprocessing.cpu_count() * 2 + 1)))
+worker_connections = int(os.getenv("WEB_WORKER_CONNECTIONS", "1000"))
+threads = int(os.getenv("WEB_THREADS", "8"))
+timeout = int(os.getenv("WEB_TIMEOUT", "60"))
+graceful_timeout = int(os.getenv("WEB_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("WEB_KEEPALIVE", "5"))
+max_requests = int(os.getenv("WEB_MAX_REQUESTS", "0"))
+max_requests_jitter = int(os.getenv("WEB_MAX_REQUESTS_JITTER", "0"))
+
+preload_app = False
+accesslog = "-"
+errorlog = "-"
+
+_compactor = None
+
+
+def on_starting(server):
+    # Counters start from zero with each master
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    for name in os.listdir(METRICS_DIR):
+        if name.startswith("metrics-"):
+            os.remove(os.path.join(METRICS_DIR, name))
+    subprocess.run(FLASK + ["prepare"], cwd=HERE, check=True)
+
+
+def when_ready(server):
+    global _compactor
+    _compactor = subprocess.Popen(FLASK + ["compact-journals", "--loop"], cwd=HERE)
+
+
+def on_exit(server):
+    if _compactor is not None:
+        _compactor.terminate()
+        _compactor.wait(timeout=10)
+    if _own_metrics_dir:
+        shutil.rmtree(METRICS_DIR, ignore_errors=True)
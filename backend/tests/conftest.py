@@ -0,0 +1,35 @@
+import os
+import sys
+
+import pytest
+from cryptography.fernet import Fernet
+
+# app.py reads its configuration at import time. Tests that need MongoDB use
+# MONGO_TEST_URI (a disposable mongod); everything else runs without one.
+MONGO_TEST_URI = os.getenv("MONGO_TEST_URI")
+os.environ["MONGO_URI"] = MONGO_TEST_URI or "mongodb://127.0.0.1:27017/?serverSelectionTimeoutMS=500"
+os.environ["MONGO_DB_NAME"] = "MINDLINKAI_test"  # never touch the real database
+os.environ["MIGRATE_ON_STARTUP"] = "0"
+os.environ["EVENT_BROKER"] = "memory"  # tests that need the Mongo broker build their own
+os.environ.setdefault("ENCRYPTION_KEY", Fernet.generate_key().decode())
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as backend  # noqa: E402
+
+
+@pytest.fixture
+def client():
+    backend.app.config["TESTING"] = True
+    return backend.app.test_client()
+
+
+@pytest.fixture
+def mongo():
+    """An empty, migrated test database. Skipped unless MONGO_TEST_URI is set."""
+    if not MONGO_TEST_URI:
+        pytest.skip("set MONGO_TEST_URI to a disposable mongod to run this test")
+    backend.database.drop_database(backend.db.name)
+    backend.run_migrations()
+    yield backend.db
+    backend.database.drop_database(backend.db.name)
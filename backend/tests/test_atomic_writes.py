@@ -0,0 +1,78 @@
+"""Concurrent writes that used to race between a read and a write."""
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from bson import ObjectId
+
+import app as backend
+
+mongomock = pytest.importorskip("mongomock")
+
+
+def test_dedupe_keeps_the_first_in_order_and_merges_arrays():
+    col = mongomock.MongoClient().db.DoctorPatients
+    doctor = ObjectId()
+    col.insert_many([
+        {"_id": 1, "doctor_id": doctor, "patients": ["a"]},
+        {"_id": 2, "doctor_id": doctor, "patients": ["b", "a"]},
+        {"_id": 3, "doctor_id": ObjectId(), "patients": ["c"]},
+    ])
+    assert backend.dedupe_documents(col, ["doctor_id"], [("_id", 1)], merge_array="patients") == 1
+    kept = col.find_one({"doctor_id": doctor})
+    assert kept["_id"] == 1 and sorted(kept["patients"]) == ["a", "b"]
+    assert col.count_documents({}) == 2
+
+
+def test_dedupe_prefers_approved_requests():
+    col = mongomock.MongoClient().db.Requests
+    pair = {"patient_id": "p", "doctor_id": "d"}
+    col.insert_many([dict(pair, status="pending"), dict(pair, status="approved"), dict(pair, status="pending")])
+    backend.dedupe_documents(col, ["patient_id", "doctor_id"], [("status", 1), ("_id", -1)])
+    assert [r["status"] for r in col.find()] == ["approved"]
+
+
+def in_parallel(client, method, url, body, n=16):
+    def call(_):
+        return getattr(client.application.test_client(), method)(url, json=body).status_code
+    with ThreadPoolExecutor(max_workers=n) as pool:
+        return list(pool.map(call, range(n)))
+
+
+def test_parallel_journal_writes_leave_one_entry(mongo, client, monkeypatch):
+    monkeypatch.setattr(backend, "analyze_mood", lambda text: {"mood": "Calm", "compound": 0.2})
+    patient_id = str(backend.patients_col.insert_one({"name": "P", "email": "p@example.com"}).inserted_id)
+    statuses = in_parallel(client, "post", "/journal/add", {"patient_id": patient_id, "entry": "today"})
+    assert set(statuses) == {200}
+    assert backend.journals_col.count_documents({"patient_id": patient_id}) == 1
+
+
+def test_parallel_reports_leave_one_document(mongo, client, monkeypatch):
+    monkeypatch.setattr(backend.background_pool, "submit", lambda *args: None)
+    body = {"patient_id": "p1", "title": "t", "summary": "s", "details": "d"}
+    assert set(in_parallel(client, "post", "/report", body)) == {200}
+    assert backend.reports_col.count_documents({"patient_id": "p1"}) == 1
+
+
+def test_parallel_requests_create_one(mongo, client):
+    patient_id = backend.patients_col.insert_one({"name": "P", "email": "r@example.com"}).inserted_id
+    doctor_id = backend.doctors_col.insert_one({"name": "D", "email": "d@example.com"}).inserted_id
+    body = {"patient_id": str(patient_id), "doctor_id": str(doctor_id)}
+    statuses = in_parallel(client, "post", "/request/doctor", body)
+    assert statuses.count(201) == 1 and statuses.count(200) == len(statuses) - 1
+    assert backend.requests_col.count_documents({"patient_id": patient_id}) == 1
+
+
+def test_parallel_assignments_share_one_doctor_record(mongo, client):
+    doctor_id = backend.doctors_col.insert_one({"name": "D", "email": "a@example.com"}).inserted_id
+    patient_ids = backend.patients_col.insert_many([
+        {"name": f"P{i}", "email": f"a{i}@example.com"} for i in range(8)
+    ]).inserted_ids
+
+    def assign(pid):
+        body = {"patient_id": str(pid), "doctor_id": str(doctor_id)}
+        return client.application.test_client().post("/assign_patient", json=body).status_code
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        assert set(pool.map(assign, patient_ids)) == {200}
+    records = list(backend.doctor_patients_col.find({"doctor_id": doctor_id}))
+    assert len(records) == 1 and sorted(records[0]["patients"]) == sorted(patient_ids)
@@ -0,0 +1,33 @@
+"""Incremental chat sync must not resend what the client already has."""
+import pytest
+from bson import ObjectId
+
+import app as backend
+
+mongomock = pytest.importorskip("mongomock")
+
+
+@pytest.fixture
+def chat(monkeypatch, client):
+    monkeypatch.setattr(backend, "messages_col", mongomock.MongoClient().db.Messages)
+    patient, doctor = str(ObjectId()), str(ObjectId())
+    for n in range(3):  # all within the same second
+        sender, receiver = (patient, doctor) if n % 2 == 0 else (doctor, patient)
+        assert client.post("/chat/send", json={
+            "sender_id": sender, "receiver_id": receiver, "sender_role": "patient", "message": f"m{n}"
+        }).status_code == 201
+    return f"/chat/{patient}/{doctor}"
+
+
+def test_repeat_poll_after_the_last_message_is_empty(chat, client):
+    newest = client.get(chat).get_json()["messages"]
+    assert [m["message"] for m in newest] == ["m0", "m1", "m2"]
+    for _ in range(3):
+        page = client.get(f"{chat}?after={newest[-1]['_id']}").get_json()
+        assert page == {"messages": [], "has_more": False}
+
+
+def test_poll_after_an_older_message_returns_only_newer_ones(chat, client):
+    first = client.get(chat).get_json()["messages"][0]
+    page = client.get(f"{chat}?after={first['_id']}").get_json()
+    assert [m["message"] for m in page["messages"]] == ["m1", "m2"]
@@ -0,0 +1,98 @@
+import pytest
+
+import app as backend
+
+mongomock = pytest.importorskip("mongomock")
+
+
+@pytest.fixture
+def conversations(monkeypatch):
+    col = mongomock.MongoClient().db.ChatbotConversations
+    monkeypatch.setattr(backend, "conversations_col", col)
+    monkeypatch.setattr(backend, "CHATBOT_RECENT_TURNS", 4)
+    # record_turns folds in the background; tests call fold_conversation directly
+    monkeypatch.setattr(backend.background_pool, "submit", lambda *args: None)
+    return col
+
+
+def chat(user_id, exchanges):
+    for i in range(exchanges):
+        backend.record_turns(user_id, f"question {i}", f"answer {i}")
+
+
+def test_prompt_without_memory_is_just_header_and_message():
+    prompt = backend.build_chat_prompt("Sam", "hello")
+    assert "User says: hello" in prompt
+    assert "Recent messages" not in prompt and "Summary" not in prompt
+
+
+def test_prompt_keeps_newest_turns_within_budget(monkeypatch):
+    monkeypatch.setattr(backend, "CHATBOT_PROMPT_TOKEN_BUDGET", 200)
+    turns = [{"role": "user", "text": f"message {i} " + "x" * 80} for i in range(50)]
+    prompt = backend.build_chat_prompt("Sam", "hello", summary="s" * 2000, turns=turns)
+    assert backend.estimate_tokens(prompt) <= 200 + 5
+    assert "message 49" in prompt and "message 0 " not in prompt
+
+
+def test_fold_moves_old_turns_into_the_summary(conversations, monkeypatch):
+    prompts = []
+    monkeypatch.setattr(backend, "generate_text", lambda prompt: prompts.append(prompt) or "they asked 0 to 2")
+    chat("u1", 5)  # 10 turns
+
+    backend.fold_conversation("u1")
+
+    summary, turns = backend.load_conversation("u1")
+    assert summary == "they asked 0 to 2"
+    assert [t["text"] for t in turns] == ["question 3", "answer 3", "question 4", "answer 4"]
+    assert "question 0" in prompts[0] and "question 3" not in prompts[0]
+
+
+def test_fold_does_not_overwrite_a_concurrent_fold(conversations, monkeypatch):
+    chat("u2", 5)
+    monkeypatch.setattr(backend, "generate_text", lambda prompt: "stale fold")
+    update_one = conversations.update_one
+
+    def racing_update_one(filter, update, *args, **kwargs):
+        # Another worker's fold lands just before this one writes
+        update_one({"_id": "u2"}, {"$set": {"summary": backend.encrypt_text("other fold")}})
+        return update_one(filter, update, *args, **kwargs)
+
+    monkeypatch.setattr(conversations, "update_one", racing_update_one)
+    backend.fold_conversation("u2")
+
+    summary, turns = backend.load_conversation("u2")
+    assert summary == "other fold"
+    assert len(turns) == 10
+
+
+@pytest.fixture
+def opener_cache(conversations, monkeypatch):
+    monkeypatch.setenv("GEMINI_API_KEY", "test")
+    monkeypatch.setattr(backend, "genai", object())
+    monkeypatch.setattr(backend, "CHATBOT_RESPONSE_CACHE", True)
+    monkeypatch.setattr(backend, "chatbot_response_cache", backend.LRUCache(10))
+    prompts = []
+    monkeypatch.setattr(backend, "generate_text", lambda prompt: prompts.append(prompt) or "Hi {name}, how are you?")
+    return prompts
+
+
+def test_openers_hit_the_cache_for_users_with_memory(opener_cache, client):
+    # As Chatbot.jsx sends them: with user_id and streaming
+    replies = [
+        client.post("/gemini", json={"prompt": prompt, "name": name, "user_id": user_id, "stream": True}).get_data(as_text=True)
+        for user_id, name, prompt in [("u1", "Sam", "hi"), ("u1", "Sam", "Hi!"), ("u2", "Ana", "hi"), ("u2", "Ana", "hi")]
+    ]
+
+    assert replies == ["Hi Sam, how are you?"] * 2 + ["Hi Ana, how are you?"] * 2
+    assert len(opener_cache) == 1 and "Sam" not in opener_cache[0]
+    stats = client.get("/gemini/cache/stats").get_json()
+    assert stats["hits"] == 3 and stats["misses"] == 1
+    summary, turns = backend.load_conversation("u2")
+    assert [t["text"] for t in turns] == ["hi", "Hi Ana, how are you?"] * 2
+
+
+def test_longer_prompts_use_memory_not_the_cache(opener_cache, client):
+    chat("u3", 1)
+    client.post("/gemini", json={"prompt": "I could not sleep again last night", "name": "Sam", "user_id": "u3"})
+    assert "question 0" in opener_cache[0]
+    assert client.get("/gemini/cache/stats").get_json()["hits"] == 0
@@ -0,0 +1,32 @@
+"""The cohort view joins patients and journals without $expr lookups."""
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+
+import app as backend
+
+mongomock = pytest.importorskip("mongomock")
+
+
+def test_cohort_trend_is_recent_ordered_and_counted(monkeypatch, client):
+    db = mongomock.MongoClient().db
+    for name, col in (("doctor_patients_col", db.DoctorPatients), ("patients_col", db.Patient), ("journals_col", db.Journals)):
+        monkeypatch.setattr(backend, name, col)
+    doctor, ana, ben = ObjectId(), ObjectId(), ObjectId()
+    db.DoctorPatients.insert_one({"doctor_id": doctor, "patients": [ana, ben]})
+    db.Patient.insert_many([{"_id": ana, "name": "Ana"}, {"_id": ben, "name": "Ben"}])
+    day = lambda ago: (datetime.utcnow() - timedelta(days=ago)).strftime("%Y-%m-%d")
+    db.Journals.insert_many([
+        {"patient_id": str(ana), "date": day(1), "mood": "Happy", "sentiment_score": 0.8},
+        {"patient_id": str(ana), "date": day(3), "mood": "Sad", "sentiment_score": -0.5},
+        {"patient_id": str(ana), "date": day(30), "mood": "Angry", "sentiment_score": -0.9},
+    ])
+
+    rows = {r["name"]: r for r in client.get(f"/doctor/{doctor}/cohort/mood").get_json()}
+
+    assert [d["date"] for d in rows["Ana"]["trend"]] == [day(3), day(1)]
+    assert rows["Ana"]["latest_sentiment"] == 0.8
+    assert rows["Ana"]["mood_distribution"] == {"Happy": 1, "Calm": 0, "Neutral": 0, "Sad": 1, "Angry": 0}
+    assert rows["Ben"]["trend"] == [] and rows["Ben"]["latest_sentiment"] is None
+
@@ -0,0 +1,55 @@
+"""ETags must change whenever anything a cached list shows has changed."""
+from datetime import datetime, timedelta
+
+import pytest
+
+import app as backend
+
+mongomock = pytest.importorskip("mongomock")
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    db = mongomock.MongoClient().db
+    for name, col in (("sessions_col", db.Sessions), ("doctors_col", db.Doctors), ("patients_col", db.Patients)):
+        monkeypatch.setattr(backend, name, col)
+    return db
+
+
+def test_session_etag_follows_a_renamed_patient(fake_db, client):
+    created = datetime.utcnow() - timedelta(days=1)
+    doctor_id = fake_db.Doctors.insert_one({"name": "Dr Who", "created_at": created}).inserted_id
+    patient_id = fake_db.Patients.insert_one({"name": "Amy", "created_at": created}).inserted_id
+    fake_db.Sessions.insert_one({
+        "doctor_id": doctor_id, "patient_id": patient_id, "date": "2030-01-01",
+        "time": "10:00", "status": "pending", "created_by": "patient", "created_at": created
+    })
+    url = f"/sessions/doctor/{doctor_id}"
+
+    first = client.get(url)
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+    fake_db.Patients.update_one({"_id": patient_id}, {"$set": {"name": "Amelia", "updated_at": datetime.utcnow()}})
+    renamed = client.get(url, headers={"If-None-Match": etag})
+    assert renamed.status_code == 200
+    assert renamed.get_json()[0]["patient_name"] == "Amelia"
+
+
+def test_empty_session_list_has_a_stable_etag(fake_db, client):
+    url = "/sessions/patient/" + str(backend.ObjectId())
+    etag = client.get(url).headers["ETag"]
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+
+def test_unchanged_profile_patch_reports_no_changes(fake_db, client):
+    patient_id = fake_db.Patients.insert_one({"name": "Amy", "age": 30}).inserted_id
+
+    response = client.patch(f"/update/patient/{patient_id}", json={"name": "Amy", "age": 30})
+    assert response.get_json() == {"message": "No changes made."}
+    assert "updated_at" not in fake_db.Patients.find_one({"_id": patient_id})
+
+    response = client.patch(f"/update/patient/{patient_id}", json={"name": "Amelia"})
+    assert response.get_json()["message"] == "Profile updated successfully."
+    assert "updated_at" in fake_db.Patients.find_one({"_id": patient_id})
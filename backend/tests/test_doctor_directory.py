@@ -0,0 +1,40 @@
+"""Directory pages cached by one worker go stale when another worker writes."""
+import pytest
+
+import app as backend
+
+mongomock = pytest.importorskip("mongomock")
+
+
+@pytest.fixture
+def directory(monkeypatch):
+    db = mongomock.MongoClient().db
+    monkeypatch.setattr(backend, "doctors_col", db.Doctor)
+    monkeypatch.setattr(backend, "cache_generations_col", db.CacheGenerations)
+    monkeypatch.setattr(backend, "doctor_directory_cache", backend.LRUCache(16, ttl=300))
+    return db
+
+
+def names(client):
+    return [d["name"] for d in client.get("/doctors").get_json()["doctors"]]
+
+
+def test_a_write_on_another_worker_invalidates_cached_pages(directory, client, monkeypatch):
+    directory.Doctor.insert_one({"name": "Dr A"})
+    assert names(client) == ["Dr A"]
+
+    # Another worker registers a doctor; only its own cache is cleared
+    directory.Doctor.insert_one({"name": "Dr B"})
+    with monkeypatch.context() as other_worker:
+        other_worker.setattr(backend, "doctor_directory_cache", backend.LRUCache(16))
+        backend.invalidate_doctor_directory()
+    assert backend.doctor_directory_cache.stats()["size"] == 1
+
+    assert names(client) == ["Dr A", "Dr B"]
+
+
+def test_unchanged_directory_is_served_from_the_cache(directory, client):
+    directory.Doctor.insert_one({"name": "Dr A"})
+    names(client)
+    names(client)
+    assert backend.doctor_directory_cache.stats()["hits"] == 1
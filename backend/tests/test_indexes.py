@@ -0,0 +1,19 @@
+import app as backend
+
+
+def test_plan_stages_finds_nested_collscan():
+    plan = {"stage": "SORT", "inputStage": {"stage": "OR", "inputStages": [
+        {"stage": "FETCH", "inputStage": {"stage": "IXSCAN"}},
+        {"stage": "COLLSCAN"},
+    ]}}
+    assert "COLLSCAN" in set(backend._plan_stages(plan))
+
+
+def test_hot_queries_use_an_index(mongo):
+    assert backend.find_collection_scans() == []
+
+
+def test_migrations_are_recorded_once(mongo):
+    backend.run_migrations()  # second run is a no-op
+    applied = [m["_id"] for m in backend.migrations_col.find()]
+    assert sorted(applied) == [version for version, _, _ in backend.MIGRATIONS]
@@ -0,0 +1,20 @@
+import app as backend
+
+
+def test_preflight_allows_job_headers(client):
+    response = client.options("/report/summary/abc", headers={
+        "Origin": "http://localhost:5173",
+        "Access-Control-Request-Method": "GET",
+        "Access-Control-Request-Headers": "Idempotency-Key, Prefer",
+    })
+    allowed = response.headers.get("Access-Control-Allow-Headers", "").lower()
+    assert "idempotency-key" in allowed and "prefer" in allowed
+
+
+def test_finished_jobs_get_an_expiry(mongo, monkeypatch):
+    monkeypatch.setitem(backend.JOB_HANDLERS, "noop", lambda params: ({"ok": True}, 200))
+    job_id = backend.jobs_col.insert_one({"kind": "noop", "params": {}, "status": "queued"}).inserted_id
+    backend.run_job(job_id)
+    job = backend.jobs_col.find_one({"_id": job_id})
+    assert job["status"] == "succeeded"
+    assert job["expire_at"] - job["updated_at"] == backend.JOB_RETENTION
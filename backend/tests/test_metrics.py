@@ -0,0 +1,35 @@
+"""/metrics covers every worker, whichever one a scrape reaches."""
+import app as backend
+
+
+def test_render_sums_the_files_of_every_worker(tmp_path):
+    workers = [backend.Metrics(str(tmp_path)) for _ in range(3)]
+    for n, worker in enumerate(workers, start=1):
+        worker.inc("http_requests_total", {"endpoint": "get_all_doctors", "method": "GET", "status": 200}, n)
+        worker.observe("http_request_duration_seconds", {"endpoint": "get_all_doctors"}, 0.02 * n)
+    for worker in workers[1:]:
+        worker.write()
+
+    text = workers[0].render()  # writes its own file first
+    assert 'http_requests_total{endpoint="get_all_doctors",method="GET",status="200"} 6' in text
+    assert 'http_request_duration_seconds_bucket{endpoint="get_all_doctors",le="0.025"} 1' in text
+    assert 'http_request_duration_seconds_bucket{endpoint="get_all_doctors",le="0.05"} 2' in text
+    assert 'http_request_duration_seconds_count{endpoint="get_all_doctors"} 3' in text
+    assert text.count("# TYPE http_requests_total counter") == 1
+
+
+def test_exited_workers_still_count(tmp_path):
+    gone = backend.Metrics(str(tmp_path))
+    gone.inc("mongo_commands_total", {"command": "find", "outcome": "ok"}, 5)
+    gone.write()
+    del gone
+    live = backend.Metrics(str(tmp_path))
+    live.inc("mongo_commands_total", {"command": "find", "outcome": "ok"})
+    assert 'mongo_commands_total{command="find",outcome="ok"} 6' in live.render()
+    assert not [p for p in tmp_path.iterdir() if p.suffix == ".tmp"]
+
+
+def test_without_a_directory_render_is_process_local():
+    local = backend.Metrics()
+    local.inc("mongo_pool_checkout_timeouts_total")
+    assert "mongo_pool_checkout_timeouts_total 1" in local.render()
@@ -0,0 +1,61 @@
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+
+import app as backend
+
+
+def fake_moods(texts):
+    return [{"mood": "Happy", "compound": 0.8} if "great" in t else {"mood": "Sad", "compound": -0.4} for t in texts]
+
+
+def test_rescore_batch_keeps_patient_and_date(monkeypatch):
+    monkeypatch.setattr(backend, "analyze_moods", fake_moods)
+    batch = [
+        ("j1", backend.encrypt_text("a great day"), "p1", "2030-01-01"),
+        ("j2", "not a fernet token", "p1", "2030-01-02"),
+    ]
+    assert backend._rescore_batch(batch) == [("j1", "p1", "2030-01-01", "Happy", 0.8)]
+
+
+def test_rescore_updates_rollups(mongo, monkeypatch):
+    monkeypatch.setattr(backend, "analyze_moods", fake_moods)
+    monkeypatch.setattr(backend, "get_sentiment_analyzer", lambda: None)
+    backend.journals_col.insert_one({
+        "patient_id": "p1", "date": "2030-01-01", "entry": backend.encrypt_text("a great day"),
+        "mood": "Sad", "sentiment_score": -0.4, "lexicon_version": "old"
+    })
+    backend.update_mood_rollups("p1", "2030-01-01", "Sad", -0.4)
+
+    assert backend.rescore_journals(workers=1) == 1
+
+    day = backend.mood_rollups_col.find_one({"_id": "p1:day:2030-01-01"})
+    assert day["days"]["2030-01-01"] == {"mood": "Happy", "score": 0.8}
+    assert day["mood_counts"]["Happy"] == 1 and day["mood_counts"]["Sad"] == 0
+
+
+def test_backfill_is_a_migration(mongo):
+    # The fixture already migrated an empty database; journals written
+    # before rollups existed are picked up when migration 10 runs
+    backend.migrations_col.delete_one({"_id": 10})
+    backend.journals_col.insert_one({"patient_id": "p2", "date": "2030-02-01", "mood": "Calm", "sentiment_score": 0.2})
+    backend.run_migrations()
+    assert backend.mood_rollups_col.count_documents({"patient_id": "p2"}) == 3
+
+
+def test_patient_mood_graph_only_shows_the_last_week(monkeypatch, client):
+    mongomock = pytest.importorskip("mongomock")
+    db = mongomock.MongoClient().db
+    monkeypatch.setattr(backend, "mood_rollups_col", db.MoodRollups)
+    monkeypatch.setattr(backend, "doctor_patients_col", db.DoctorPatients)
+    doctor, patient = ObjectId(), ObjectId()
+    db.DoctorPatients.insert_one({"doctor_id": doctor, "patients": [patient]})
+    day = lambda ago: (datetime.utcnow() - timedelta(days=ago)).strftime("%Y-%m-%d")
+    db.MoodRollups.insert_many([
+        {"patient_id": str(patient), "granularity": "day", "bucket": day(ago), "days": {day(ago): {"mood": mood, "score": score}}}
+        for ago, mood, score in ((40, "Sad", -0.4), (1, "Happy", 0.8))
+    ])
+
+    graph = client.get(f"/doctor/{doctor}/patient/{patient}/mood").get_json()
+    assert graph == [{"date": day(1), "mood": "Happy", "sentiment_score": 0.8}]
@@ -0,0 +1,59 @@
+"""Routes that resolve names must not issue one query per row (N+1)."""
+import app as backend
+
+
+def mongo_commands(endpoint):
+    return backend.metrics.value("http_request_mongo_commands_total", {"endpoint": endpoint})
+
+
+def commands_for(client, url, endpoint):
+    before = mongo_commands(endpoint)
+    response = client.get(url)
+    assert response.status_code == 200
+    return mongo_commands(endpoint) - before
+
+
+def seed_patients(n, tag):
+    return backend.patients_col.insert_many([
+        {"name": f"patient {i}", "email": f"{tag}-{i}@example.com"} for i in range(n)
+    ]).inserted_ids
+
+
+def test_doctor_requests_use_a_constant_number_of_queries(mongo, client):
+    counts = []
+    for n in (2, 20):
+        doctor_id = backend.doctors_col.insert_one({"name": "Dr", "email": f"dr-{n}@example.com"}).inserted_id
+        backend.requests_col.insert_many([
+            {"doctor_id": doctor_id, "patient_id": pid, "status": "pending"}
+            for pid in seed_patients(n, f"req{n}")
+        ])
+        counts.append(commands_for(client, f"/doctor/{doctor_id}/requests", "get_doctor_requests"))
+    assert counts == [2, 2]
+
+
+def test_sessions_use_a_constant_number_of_queries(mongo, client):
+    counts = []
+    for n in (2, 20):
+        doctor_id = backend.doctors_col.insert_one({"name": "Dr", "email": f"dr-s{n}@example.com"}).inserted_id
+        backend.sessions_col.insert_many([
+            {"doctor_id": doctor_id, "patient_id": pid, "date": "2030-01-01", "time": f"{i:02d}:00",
+             "status": "pending", "created_by": "patient"}
+            for i, pid in enumerate(seed_patients(n, f"ses{n}"))
+        ])
+        counts.append(commands_for(client, f"/sessions/doctor/{doctor_id}", "get_sessions"))
+    assert counts[0] == counts[1]
+
+
+def test_session_revalidation_is_one_query(mongo, client):
+    doctor_id = backend.doctors_col.insert_one({"name": "Dr", "email": "dr-etag@example.com"}).inserted_id
+    backend.sessions_col.insert_many([
+        {"doctor_id": doctor_id, "patient_id": pid, "date": "2030-01-01", "time": f"{i:02d}:00",
+         "status": "pending", "created_by": "patient"}
+        for i, pid in enumerate(seed_patients(5, "etag"))
+    ])
+    url = f"/sessions/doctor/{doctor_id}"
+    etag = client.get(url).headers["ETag"]
+
+    before = mongo_commands("get_sessions")
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+    assert mongo_commands("get_sessions") - before == 1
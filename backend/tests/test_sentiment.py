@@ -0,0 +1,45 @@
+import pickle
+
+import pytest
+
+import app as backend
+
+
+class FakeAnalyzer:
+    def __init__(self):
+        self.lexicon = {"good": 1.9}
+
+
+@pytest.fixture
+def fake_vader(monkeypatch):
+    monkeypatch.setattr(backend, "SentimentIntensityAnalyzer", FakeAnalyzer)
+    monkeypatch.setattr(backend.nltk.data, "find", lambda name: name)
+
+
+def test_build_lexicon_writes_version_and_custom_words(fake_vader, tmp_path):
+    path = tmp_path / "lexicon.pkl"
+    backend.build_lexicon(str(path))
+    compiled = pickle.loads(path.read_bytes())
+    assert compiled["version"] == backend.LEXICON_VERSION
+    assert compiled["lexicon"]["good"] == 1.9
+    assert compiled["lexicon"]["furious"] == backend.custom_words["furious"]
+
+
+def test_failed_build_keeps_the_old_lexicon(fake_vader, tmp_path, monkeypatch):
+    path = tmp_path / "lexicon.pkl"
+    path.write_bytes(b"old")
+
+    def broken_dump(*args, **kwargs):
+        raise RuntimeError("disk full")
+
+    monkeypatch.setattr(backend.pickle, "dump", broken_dump)
+    with pytest.raises(RuntimeError):
+        backend.build_lexicon(str(path))
+    assert path.read_bytes() == b"old"
+    assert [p.name for p in tmp_path.iterdir()] == ["lexicon.pkl"]
+
+
+def test_load_lexicon_rebuilds_an_outdated_file(fake_vader, tmp_path):
+    path = tmp_path / "lexicon.pkl"
+    path.write_bytes(pickle.dumps({"version": "old", "lexicon": {}}))
+    assert "furious" in backend.load_lexicon(str(path))
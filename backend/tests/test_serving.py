@@ -0,0 +1,116 @@
+"""The production setup: events across workers, streams that do not pin threads."""
+import os
+import queue
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+import requests
+from bson import ObjectId
+
+import app as backend
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORKERS = 3
+# More open streams than the old gthread default could hold (3 workers x 8 threads)
+STREAMS = 30
+
+
+def test_mongo_broker_delivers_events_published_elsewhere(mongo):
+    listener = backend.MongoEventBroker(backend.events_col)
+    publisher = backend.MongoEventBroker(backend.events_col)  # as if in another worker
+    q = listener.subscribe("u1")
+    try:
+        time.sleep(0.5)  # let the tail open its cursor
+        publisher.publish({"u2"}, "chat", {"text": "not for u1"})
+        publisher.publish({"u1"}, "chat", {"text": "hello"})
+        message = q.get(timeout=10)
+        assert message.startswith("event: chat\n") and "hello" in message
+        with pytest.raises(queue.Empty):
+            q.get(timeout=1)
+    finally:
+        listener.unsubscribe("u1", q)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def server(mongo):
+    pytest.importorskip("gunicorn")
+    pytest.importorskip("gevent")
+    port = free_port()
+    env = dict(os.environ, BIND=f"127.0.0.1:{port}", WEB_WORKERS=str(WORKERS),
+               EVENT_BROKER="mongo", MIGRATE_ON_STARTUP="1", METRICS_WRITE_SECONDS="0.5")
+    proc = subprocess.Popen([sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py"], cwd=BACKEND, env=env)
+    base = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.monotonic() + 60
+        while True:
+            assert proc.poll() is None, "gunicorn exited during startup"
+            try:
+                requests.get(base + "/doctors", timeout=1)
+                break
+            except requests.ConnectionError:
+                assert time.monotonic() < deadline, "gunicorn did not start"
+                time.sleep(0.5)
+        yield base
+    finally:
+        proc.terminate()
+        proc.wait(timeout=60)
+
+
+def test_workers_share_events_and_keep_serving_with_streams_open(server):
+    user_id = str(ObjectId())
+    connected = threading.Barrier(STREAMS + 1, timeout=30)
+    received = queue.Queue()
+    streams = []
+
+    def listen():
+        response = requests.get(f"{server}/events/{user_id}", stream=True, timeout=30)
+        streams.append(response)
+        lines = response.iter_lines(decode_unicode=True)
+        for line in lines:
+            if line.startswith("retry:"):
+                connected.wait()
+            elif line == "event: smoke":
+                received.put(next(lines))
+                return
+
+    for _ in range(STREAMS):
+        threading.Thread(target=listen, daemon=True).start()
+    try:
+        connected.wait()
+        # Every stream is open, yet plain requests are still served promptly
+        assert requests.get(server + "/doctors", timeout=5).status_code == 200
+
+        # Published from this process, so every worker's streams rely on the shared log
+        backend.MongoEventBroker(backend.events_col).publish({user_id}, "smoke", {"n": 1})
+        payloads = [received.get(timeout=15) for _ in range(STREAMS)]
+        assert payloads == ['data: {"n":1}'] * STREAMS
+    finally:
+        for response in streams:
+            response.close()
+
+
+def test_metrics_cover_every_worker(server):
+    before = requests_served(requests.get(server + "/metrics", timeout=5).text)
+    for _ in range(30):
+        assert requests.get(server + "/doctors", timeout=5).status_code == 200
+    time.sleep(1)  # let the other workers write their files
+    # Whichever worker answers, the count includes requests the others served
+    for _ in range(WORKERS):
+        assert requests_served(requests.get(server + "/metrics", timeout=5).text) >= before + 30
+
+
+def requests_served(text):
+    return sum(
+        float(line.rsplit(" ", 1)[1]) for line in text.splitlines()
+        if line.startswith('http_requests_total{endpoint="get_all_doctors"')
+    )
@@ -0,0 +1,71 @@
+"""Zoom token caching and retry behaviour against a local stub server."""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import app as backend
+
+
+class StubZoom(BaseHTTPRequestHandler):
+    meeting_statuses = []  # status codes to answer meeting creation with, in order
+    calls = []
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        path = self.path.split("?")[0]
+        self.calls.append(path)
+        if path == "/oauth/token":
+            status, body = 200, {"access_token": f"token-{len(self.calls)}", "expires_in": 3600}
+        else:
+            status = self.meeting_statuses.pop(0) if self.meeting_statuses else 201
+            body = {"join_url": "https://zoom.example/j/1"} if status == 201 else {"message": "error"}
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def zoom(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubZoom)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+    monkeypatch.setattr(backend, "ZOOM_OAUTH_URL", f"{base}/oauth/token")
+    monkeypatch.setattr(backend, "ZOOM_API_URL", base)
+    monkeypatch.setattr(backend, "_zoom_token", None)
+    StubZoom.calls, StubZoom.meeting_statuses = [], []
+    yield StubZoom
+    server.shutdown()
+    server.server_close()
+
+
+def test_token_is_fetched_once_for_several_meetings(zoom):
+    for _ in range(3):
+        assert backend.request_zoom_meeting({"topic": "t"})["join_url"]
+    assert zoom.calls.count("/oauth/token") == 1
+    assert zoom.calls.count("/users/me/meetings") == 3
+
+
+def test_revoked_token_is_refreshed_once(zoom):
+    zoom.meeting_statuses = [401]
+    assert backend.request_zoom_meeting({"topic": "t"})["join_url"]
+    assert zoom.calls == ["/oauth/token", "/users/me/meetings", "/oauth/token", "/users/me/meetings"]
+
+
+def test_meeting_post_is_not_retried_on_gateway_errors(zoom):
+    zoom.meeting_statuses = [502]
+    assert "join_url" not in backend.request_zoom_meeting({"topic": "t"})
+    assert zoom.calls.count("/users/me/meetings") == 1
+
+
+def test_meeting_post_is_retried_when_rate_limited(zoom):
+    zoom.meeting_statuses = [429]
+    assert backend.request_zoom_meeting({"topic": "t"})["join_url"]
+    assert zoom.calls.count("/users/me/meetings") == 2
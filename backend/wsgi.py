@@ -0,0 +1,6 @@
+"""Production entry point: `gunicorn -c gunicorn.conf.py wsgi:app`."""
+from app import create_app
+
+# Once-per-deployment tasks and journal compaction are run by the gunicorn
+# master (gunicorn.conf.py), not by every worker.
+app = create_app(prepare=False, background=False)
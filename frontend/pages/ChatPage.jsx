@@ -1,4 +1,4 @@
-import React, { useEffect, useState } from "react";
+import React, { useEffect, useRef, useState } from "react";
 
 export default function ChatPage({ role }) {
   const storedUser = localStorage.getItem("user");
@@ -40,21 +40,54 @@ export default function ChatPage({ role }) {
     }
   }, [role, user]);
 
-  // Fetch chat messages
+  // Fetch chat messages: newest page first, then only newer ones
+  const lastIdRef = useRef(null);
+  const oldestIdRef = useRef(null);
+  const syncRef = useRef(null);
+  const chatBoxRef = useRef(null);
+  const [hasOlder, setHasOlder] = useState(false);
+  const [loadingOlder, setLoadingOlder] = useState(false);
+
+  const chatUrl = (query) => {
+    const patientId = role === "patient" ? user.id : receiverId;
+    const doctorId = role === "doctor" ? user.id : receiverId;
+    return `http://127.0.0.1:5000/chat/${patientId}/${doctorId}${query}`;
+  };
+
   useEffect(() => {
     if (!receiverId) return;
 
+    lastIdRef.current = null;
+    oldestIdRef.current = null;
+    setMessages([]);
+    setHasOlder(false);
+
     const fetchMessages = async () => {
       try {
-        const patientId = role === "patient" ? user.id : receiverId;
-        const doctorId = role === "doctor" ? user.id : receiverId;
-
-        const res = await fetch(
-          `http://127.0.0.1:5000/chat/${patientId}/${doctorId}`
-        );
-        if (!res.ok) throw new Error("Failed to fetch chat");
-        const data = await res.json();
-        setMessages(data);
+        let hasMore = true;
+        while (hasMore) {
+          const first = !lastIdRef.current;
+          const res = await fetch(
+            chatUrl(first ? "" : `?after=${lastIdRef.current}`)
+          );
+          if (!res.ok) throw new Error("Failed to fetch chat");
+          const data = await res.json();
+          const page = data.messages;
+
+          if (first) {
+            oldestIdRef.current = page.length > 0 ? page[0]._id : null;
+            setHasOlder(data.has_more);
+          }
+          if (page.length > 0) {
+            lastIdRef.current = page[page.length - 1]._id;
+            // Overlapping polls may return the same messages; keep each once
+            setMessages((prev) => {
+              const seen = new Set(prev.map((m) => m._id));
+              return [...prev, ...page.filter((m) => !seen.has(m._id))];
+            });
+          }
+          hasMore = !first && data.has_more;
+        }
       } catch (err) {
         console.error("Chat fetch error:", err);
       } finally {
@@ -62,11 +95,53 @@ export default function ChatPage({ role }) {
       }
     };
 
+    syncRef.current = fetchMessages;
     fetchMessages();
-    const interval = setInterval(fetchMessages, 3000);
-    return () => clearInterval(interval);
+
+    // New messages are pushed over SSE; the slow poll only covers missed events
+    const events = new EventSource(`http://127.0.0.1:5000/events/${user.id}`);
+    events.addEventListener("chat", (e) => {
+      const msg = JSON.parse(e.data);
+      if (msg.sender_id === receiverId || msg.receiver_id === receiverId) {
+        fetchMessages();
+      }
+    });
+    const interval = setInterval(fetchMessages, 30000);
+    return () => {
+      clearInterval(interval);
+      events.close();
+    };
   }, [receiverId, role, user.id]);
 
+  // Load the previous page when the user scrolls to the top
+  const loadOlder = async () => {
+    if (!hasOlder || loadingOlder || !oldestIdRef.current) return;
+
+    setLoadingOlder(true);
+    try {
+      const res = await fetch(chatUrl(`?before=${oldestIdRef.current}`));
+      if (!res.ok) throw new Error("Failed to fetch older messages");
+      const data = await res.json();
+      const page = data.messages;
+
+      if (page.length > 0) {
+        oldestIdRef.current = page[0]._id;
+        const box = chatBoxRef.current;
+        const prevHeight = box ? box.scrollHeight : 0;
+        setMessages((prev) => [...page, ...prev]);
+        // Keep the viewport on the message the user was reading
+        requestAnimationFrame(() => {
+          if (box) box.scrollTop = box.scrollHeight - prevHeight;
+        });
+      }
+      setHasOlder(data.has_more);
+    } catch (err) {
+      console.error("Chat fetch error:", err);
+    } finally {
+      setLoadingOlder(false);
+    }
+  };
+
   // ✅ Send message (Enter key + Button)
   const handleSend = async () => {
     if (!newMessage.trim() || !receiverId) return;
@@ -86,15 +161,8 @@ export default function ChatPage({ role }) {
       const data = await res.json();
       if (res.ok) {
         setNewMessage("");
-        setMessages((prev) => [
-          ...prev,
-          {
-            sender_id: user.id,
-            sender_role: role,
-            message: newMessage,
-            timestamp: new Date().toISOString(),
-          },
-        ]);
+        // Pull the stored message (with its _id) through the incremental sync
+        syncRef.current?.();
       } else {
         alert(data.error || "Failed to send message");
       }
@@ -159,15 +227,24 @@ export default function ChatPage({ role }) {
         💬 Chat with {role === "patient" ? "Your Doctor" : "Your Patient"}
       </h2>
 
-      <div className="h-96 overflow-y-auto bg-[#fffefc] border border-[#e6e0d5] rounded-xl p-4 mb-4">
+      <div
+        ref={chatBoxRef}
+        onScroll={(e) => e.currentTarget.scrollTop === 0 && loadOlder()}
+        className="h-96 overflow-y-auto bg-[#fffefc] border border-[#e6e0d5] rounded-xl p-4 mb-4"
+      >
+        {hasOlder && (
+          <p className="text-center text-xs text-gray-400 mb-3">
+            {loadingOlder ? "Loading earlier messages..." : "Scroll up for earlier messages"}
+          </p>
+        )}
         {messages.length === 0 ? (
           <p className="text-gray-500 text-center italic">
             No messages yet. Start the conversation 🌱
           </p>
         ) : (
-          messages.map((msg, idx) => (
+          messages.map((msg) => (
             <div
-              key={idx}
+              key={msg._id}
               className={`mb-3 flex ${
                 msg.sender_id === user.id ? "justify-end" : "justify-start"
               }`}
@@ -33,6 +33,11 @@ export default function DoctorRequests() {
 
   useEffect(() => {
     fetchRequests();
+
+    // Refresh as soon as a patient sends a new request
+    const events = new EventSource(`http://127.0.0.1:5000/events/${user.id}`);
+    events.addEventListener("request", fetchRequests);
+    return () => events.close();
   }, []);
 
   return (
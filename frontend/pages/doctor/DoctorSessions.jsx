@@ -2,6 +2,7 @@
 import React, { useEffect, useState } from "react";
 import Calendar from "react-calendar";
 import "react-calendar/dist/Calendar.css";
+import { runJob } from "../../src/api/jobs";
 
 export default function DoctorSessions() {
   const user = JSON.parse(localStorage.getItem("user"));
@@ -23,9 +24,16 @@ export default function DoctorSessions() {
       .then((res) => res.json())
       .then((data) => setPatients(Array.isArray(data) ? data : []));
 
-    fetch(`http://127.0.0.1:5000/sessions/doctor/${doctorId}`)
-      .then((res) => res.json())
-      .then((data) => setSessions(Array.isArray(data) ? data : []));
+    const fetchSessions = () =>
+      fetch(`http://127.0.0.1:5000/sessions/doctor/${doctorId}`)
+        .then((res) => res.json())
+        .then((data) => setSessions(Array.isArray(data) ? data : []));
+    fetchSessions();
+
+    // Refresh when a session is created, accepted or rescheduled elsewhere
+    const events = new EventSource(`http://127.0.0.1:5000/events/${doctorId}`);
+    events.addEventListener("session", fetchSessions);
+    return () => events.close();
   }, [doctorId]);
 
   // ---------- DATE FORMAT ----------
@@ -331,11 +339,12 @@ export default function DoctorSessions() {
                       <button
                         className="bg-blue-600 text-white px-3 py-1 rounded-full text-sm"
                         onClick={async () => {
-                          const res = await fetch(`http://127.0.0.1:5000/session/${s.id}/start`, {
-                            method: "POST"
-                          });
-                          const data = await res.json();
-                          if (data.join_url) window.open(data.join_url, "_blank");
+                          // Opened during the click so it is not blocked while the meeting is created
+                          const meetingTab = window.open("", "_blank");
+                          const { data } = await runJob(`/session/${s.id}/start`, { method: "POST" })
+                            .catch(() => ({ data: {} }));
+                          if (data.join_url && meetingTab) meetingTab.location = data.join_url;
+                          else meetingTab?.close();
                         }}
                       >
                         Join
@@ -14,6 +14,7 @@ export default function PatientsInsights() {
   const doctorId = user?.id;
 
   const [patients, setPatients] = useState([]);
+  const [cohort, setCohort] = useState(null);
   const [selectedPatient, setSelectedPatient] = useState("");
   const [moodData, setMoodData] = useState([]);
   const [loading, setLoading] = useState(false);
@@ -32,31 +33,43 @@ export default function PatientsInsights() {
         .then((res) => res.json())
         .then((data) => setPatients(data))
         .catch((err) => console.error("Error fetching patients:", err));
+
+      // Mood data for every patient in one request (no journal decryption)
+      fetch(`http://127.0.0.1:5000/doctor/${doctorId}/cohort/mood`)
+        .then((res) => res.json())
+        .then((data) => setCohort(Array.isArray(data) ? data : []))
+        .catch((err) => {
+          console.error("Error fetching mood data:", err);
+          setCohort([]);
+        });
     }
   }, [doctorId]);
 
-  // Fetch mood data and report when a patient is selected
+  // Pick the selected patient's mood trend out of the cohort data
   useEffect(() => {
-    if (selectedPatient) {
+    if (!selectedPatient) return;
+    if (cohort === null) {
       setLoading(true);
+      return;
+    }
 
-      // Fetch mood data
-      fetch(`http://127.0.0.1:5000/journal/${selectedPatient}`)
-        .then((res) => res.json())
-        .then((data) => {
-          const processed = data.map((d) => ({
-            date: new Date(d.date).toLocaleDateString("en-GB", {
-              day: "numeric",
-              month: "short",
-            }),
-            sentiment_score: d.sentiment_score,
-            mood: classifyMood(d.sentiment_score),
-          }));
-          setMoodData(processed);
-        })
-        .catch((err) => console.error("Error fetching mood data:", err))
-        .finally(() => setLoading(false));
+    const entry = cohort.find((c) => c.patient_id === selectedPatient);
+    setMoodData(
+      (entry?.trend || []).map((d) => ({
+        date: new Date(d.date).toLocaleDateString("en-GB", {
+          day: "numeric",
+          month: "short",
+        }),
+        sentiment_score: d.sentiment_score,
+        mood: classifyMood(d.sentiment_score),
+      }))
+    );
+    setLoading(false);
+  }, [selectedPatient, cohort]);
 
+  // Fetch the report when a patient is selected
+  useEffect(() => {
+    if (selectedPatient) {
       // Fetch latest report
       fetch(`http://127.0.0.1:5000/report/${selectedPatient}`)
         .then((res) => res.json())
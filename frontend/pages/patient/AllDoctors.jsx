@@ -5,8 +5,25 @@ export default function AllDoctors() {
   const [message, setMessage] = useState("");
   const [assignedDoctor, setAssignedDoctor] = useState(null);
   const [connectionTime, setConnectionTime] = useState(null);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [search, setSearch] = useState("");
   const user = JSON.parse(localStorage.getItem("user"));
 
+  // Fetch one directory page; a cursor appends to the list, otherwise it replaces it
+  const loadDoctors = (cursor = null) => {
+    const params = new URLSearchParams();
+    if (search.trim()) params.set("q", search.trim());
+    if (cursor) params.set("cursor", cursor);
+    fetch(`http://127.0.0.1:5000/doctors?${params}`)
+      .then((res) => res.json())
+      .then((data) => {
+        const page = data.doctors || [];
+        setDoctors((prev) => (cursor ? [...prev, ...page] : page));
+        setNextCursor(data.next_cursor || null);
+      })
+      .catch((err) => console.error("Error fetching doctors:", err));
+  };
+
   useEffect(() => {
     // Fetch assigned doctor if any
     if (user.assigned_doctor_id) {
@@ -18,11 +35,8 @@ export default function AllDoctors() {
         })
         .catch((err) => console.error(err));
     } else {
-      // Otherwise fetch all available doctors
-      fetch("http://127.0.0.1:5000/doctors")
-        .then((res) => res.json())
-        .then((data) => setDoctors(data))
-        .catch((err) => console.error("Error fetching doctors:", err));
+      // Otherwise fetch the first page of available doctors
+      loadDoctors();
     }
   }, []);
 
@@ -96,6 +110,27 @@ export default function AllDoctors() {
         <p className="text-center text-green-700 font-medium mb-4">{message}</p>
       )}
 
+      <form
+        onSubmit={(e) => {
+          e.preventDefault();
+          loadDoctors();
+        }}
+        className="flex gap-2 mb-6"
+      >
+        <input
+          value={search}
+          onChange={(e) => setSearch(e.target.value)}
+          placeholder="Search by name or specialization"
+          className="flex-1 border border-[#e0d7ce] rounded-md px-3 py-2"
+        />
+        <button
+          type="submit"
+          className="bg-[#bcd6c7] text-[#1a3d2f] font-semibold px-4 py-2 rounded-md hover:bg-[#a7c9b5] transition"
+        >
+          Search
+        </button>
+      </form>
+
       <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-6">
         {doctors.map((doc) => (
           <div
@@ -120,6 +155,17 @@ export default function AllDoctors() {
           </div>
         ))}
       </div>
+
+      {nextCursor && (
+        <div className="text-center mt-6">
+          <button
+            onClick={() => loadDoctors(nextCursor)}
+            className="bg-white border border-[#e0d7ce] text-[#1a3d2f] px-4 py-2 rounded-md hover:bg-[#f5efe8] transition"
+          >
+            Load more
+          </button>
+        </div>
+      )}
     </div>
   );
 }
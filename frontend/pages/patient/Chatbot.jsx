@@ -1,5 +1,4 @@
 import React, { useState, useEffect, useRef, useContext } from "react";
-import axios from "axios";
 import { UserContext } from "../../src/context/UserContext";
 
 const positiveQuotes = [
@@ -37,18 +36,40 @@ const Chatbot = () => {
     setLoading(true);
 
     try {
-      const response = await axios.post("http://localhost:5000/gemini", {
-        prompt: userInput,
-        name: userName,
+      // Stream the reply so the first words show up as soon as they are generated
+      const response = await fetch("http://localhost:5000/gemini", {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({
+          prompt: userInput,
+          name: userName,
+          user_id: loggedUser?.id, // server keeps the conversation memory
+          stream: true,
+        }),
       });
+      if (!response.ok || !response.body) throw new Error("Chat request failed");
 
-      setChatHistory((prev) => [
-        ...prev,
-        { sender: "bot", text: response.data.response },
-      ]);
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let text = "";
+      setChatHistory((prev) => [...prev, { sender: "bot", text: "" }]);
+      setLoading(false);
+
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        text += decoder.decode(value, { stream: true });
+        const partial = text;
+        setChatHistory((prev) => [
+          ...prev.slice(0, -1),
+          { sender: "bot", text: partial },
+        ]);
+      }
+      if (!text.trim()) throw new Error("Empty response");
     } catch (err) {
       setChatHistory((prev) => [
-        ...prev,
+        // Drop the empty placeholder if the stream failed before any text
+        ...prev.filter((m, i) => i < prev.length - 1 || m.sender !== "bot" || m.text),
         { sender: "bot", text: "😔 Sorry, something went wrong. Please try again." },
       ]);
     } finally {
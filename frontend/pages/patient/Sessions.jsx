@@ -1,6 +1,7 @@
 import React, { useEffect, useState } from "react";
 import Calendar from "react-calendar";
 import "react-calendar/dist/Calendar.css";
+import { runJob } from "../../src/api/jobs";
 
 export default function Sessions() {
   const user = JSON.parse(localStorage.getItem("user"));
@@ -9,6 +10,8 @@ export default function Sessions() {
   const [sessions, setSessions] = useState([]);
   const [selectedDate, setSelectedDate] = useState(new Date());
   const [availableDoctors, setAvailableDoctors] = useState([]);
+  const [doctorSearch, setDoctorSearch] = useState("");
+  const [doctorCursor, setDoctorCursor] = useState(null);
   const [doctorId, setDoctorId] = useState("");
   const [time, setTime] = useState("");
 
@@ -36,14 +39,26 @@ export default function Sessions() {
     return selected < new Date();
   };
 
+  // Fetch one page of the doctor directory; a cursor appends to the list
+  const loadDoctors = (cursor = null) => {
+    const params = new URLSearchParams({ limit: "50" });
+    if (doctorSearch.trim()) params.set("q", doctorSearch.trim());
+    if (cursor) params.set("cursor", cursor);
+    fetch(`http://127.0.0.1:5000/doctors?${params}`)
+      .then((res) => res.json())
+      .then((data) => {
+        const page = Array.isArray(data.doctors) ? data.doctors : [];
+        setAvailableDoctors((prev) => (cursor ? [...prev, ...page] : page));
+        setDoctorCursor(data.next_cursor || null);
+      });
+  };
+
   useEffect(() => {
     fetch(`http://127.0.0.1:5000/sessions/patient/${patientId}`)
       .then((res) => res.json())
       .then((data) => setSessions(Array.isArray(data) ? data : []));
 
-    fetch(`http://127.0.0.1:5000/doctors`)
-      .then((res) => res.json())
-      .then((data) => setAvailableDoctors(Array.isArray(data) ? data : []));
+    loadDoctors();
   }, [patientId]);
 
   const handleCreateSession = async () => {
@@ -152,22 +167,24 @@ export default function Sessions() {
   //      JOIN SESSION HANDLER
   // ---------------------------
   const handleJoinSession = async (sessionId) => {
+    // Open the tab during the click so it is not blocked while the meeting is created
+    const meetingTab = window.open("", "_blank");
     try {
-      const res = await fetch(
-        `http://127.0.0.1:5000/session/${sessionId}/start`,
-        { method: "POST" }
-      );
-      const data = await res.json();
+      const { ok, data } = await runJob(`/session/${sessionId}/start`, { method: "POST" });
 
-      if (!res.ok) {
+      if (!ok) {
+        meetingTab?.close();
         alert(data.error || "Failed to join session");
         return;
       }
 
-      if (data.join_url) {
-        window.open(data.join_url, "_blank");
+      if (data.join_url && meetingTab) {
+        meetingTab.location = data.join_url;
+      } else {
+        meetingTab?.close();
       }
     } catch (error) {
+      meetingTab?.close();
       console.error("Join error:", error);
       alert("Error joining session");
     }
@@ -221,8 +238,32 @@ export default function Sessions() {
         <div className="flex-1">
           <h3 className="text-lg font-semibold mb-3">Request New Session</h3>
 
+          {/* The directory search matches whole words, so it runs on submit */}
+          <form
+            onSubmit={(e) => {
+              e.preventDefault();
+              loadDoctors();
+            }}
+            className="flex gap-2 mb-2"
+          >
+            <input
+              type="text"
+              value={doctorSearch}
+              onChange={(e) => setDoctorSearch(e.target.value)}
+              placeholder="Search doctors by name or specialization"
+              className="flex-1 p-2 border rounded-lg"
+            />
+            <button
+              type="submit"
+              className="bg-green-600 text-white px-4 rounded-lg hover:bg-green-700"
+            >
+              Search
+            </button>
+          </form>
+
           <select
-            className="w-full p-2 border rounded-lg mb-3"
+            className="w-full p-2 border rounded-lg mb-1"
+            value={doctorId}
             onChange={(e) => setDoctorId(e.target.value)}
           >
             <option value="">Select Doctor</option>
@@ -233,6 +274,17 @@ export default function Sessions() {
             ))}
           </select>
 
+          {doctorCursor && (
+            <button
+              type="button"
+              onClick={() => loadDoctors(doctorCursor)}
+              className="text-sm text-green-700 hover:underline mb-3"
+            >
+              Load more doctors
+            </button>
+          )}
+          <div className="mb-2" />
+
           <input
             type="time"
             className="w-full p-2 border rounded-lg mb-3"
@@ -0,0 +1,31 @@
+// Slow provider calls (Zoom, Gemini) run as server-side jobs: with
+// "Prefer: respond-async" the backend answers 202 and a status_url, which is
+// polled here until the job finishes, so no request waits on the provider.
+const API_URL = "http://127.0.0.1:5000";
+const POLL_INTERVAL_MS = 1000;
+const POLL_TIMEOUT_MS = 120000;
+
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+// Resolves to { ok, data } like a direct call: data is the route's JSON body
+export async function runJob(path, options = {}) {
+  const res = await fetch(`${API_URL}${path}`, {
+    ...options,
+    headers: { ...options.headers, Prefer: "respond-async" },
+  });
+  const data = await res.json();
+  if (res.status !== 202) return { ok: res.ok, data }; // answered right away
+
+  const deadline = Date.now() + POLL_TIMEOUT_MS;
+  while (Date.now() < deadline) {
+    await sleep(POLL_INTERVAL_MS);
+    const poll = await fetch(`${API_URL}${data.status_url}`);
+    const job = await poll.json();
+    if (!poll.ok) return { ok: false, data: job };
+    if (job.status === "succeeded") return { ok: true, data: job.result };
+    if (job.status === "failed") {
+      return { ok: false, data: job.result || { error: job.error || "Request failed" } };
+    }
+  }
+  return { ok: false, data: { error: "Timed out waiting for the server" } };
+}
@@ -1,4 +1,5 @@
 import React, { useEffect, useState } from "react";
+import { runJob } from "../api/jobs";
 
 export default function Summary({ patientId }) {
   const [loading, setLoading] = useState(true);
@@ -8,9 +9,8 @@ export default function Summary({ patientId }) {
   useEffect(() => {
     const fetchSummary = async () => {
       try {
-        const res = await fetch(`http://127.0.0.1:5000/report/summary/${patientId}`);
-        const data = await res.json();
-        if (!res.ok) {
+        const { ok, data } = await runJob(`/report/summary/${patientId}`);
+        if (!ok) {
           setError(data.error || "Failed to fetch summary.");
         } else {
           setSummaryData(data);